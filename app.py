@@ -1,59 +1,58 @@
 import os
+import atexit
 import json
-import base64
-from io import StringIO, BytesIO
+import time
 from urllib.parse import quote_plus, urlencode
-import tempfile
 from datetime import datetime
 import logging
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from flask import Flask, request, jsonify, Response, stream_with_context, session, redirect, url_for
+from flask import Blueprint, Flask, Request, current_app, g, request, jsonify, Response, stream_with_context, session, redirect, url_for
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from werkzeug.utils import secure_filename
+
+from llm_clients import registry as llm_registry
+from title_worker import TitleWorker
+from response_cache import create_response_cache, make_cache_key
+import extraction_cache
+from upload_spool import UploadSpool
+import rate_limit  # registers the sqlite:// limiter storage
+import metrics
+from context_builder import ContextBuilder, count_tokens, truncate_to_tokens
+from summary_worker import SummaryWorker
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
 
-# LangChain core messages for prompt construction
-from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-
-# Configure logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+# Configure logging (LOG_LEVEL, LOG_LEVELS, LOG_FORMAT, ...; see log_config.py)
+from log_config import configure_logging
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Print API key for debugging (remove in production)
-logger.info(f"GEMINI_API_KEY loaded: {'Yes' if os.getenv('GEMINI_API_KEY') else 'No'}")
+logger.info("GEMINI_API_KEY loaded: %s", 'Yes' if os.getenv('GEMINI_API_KEY') else 'No')
 
-# PDF processing imports
-try:
-    from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
-    from pdfminer.converter import TextConverter
-    from pdfminer.layout import LAParams
-    from pdfminer.pdfpage import PDFPage
-    PDF_MINER_AVAILABLE = True
-except ImportError:
-    PDF_MINER_AVAILABLE = False
-    logger.warning("pdfminer.six not available. PDF processing disabled.")
+# Document extraction (pdfminer lives in extraction.py so worker processes can import it cheaply)
+from extraction import (
+    PDF_MINER_AVAILABLE, PDF_MINER_MODULES, EXTRACT_MAX_CHARS, PDF_MAX_PAGES,
+    as_binary_stream, extract_text_from_pdf, extract_text_from_txt,
+)
+from extraction_service import ExtractionSaturated, ExtractionTimeout, ExtractionTooLarge, create_extraction_service
 
-# PDF to image conversion imports
-try:
-    from pdf2image import convert_from_bytes
-    PDF2IMAGE_AVAILABLE = True
-except ImportError:
-    PDF2IMAGE_AVAILABLE = False
-    logger.warning("pdf2image not available. Vision processing disabled.")
+# Vision model extraction (enabled when VISION_API_BASE points at an OpenAI-compatible endpoint)
+from vision import (
+    PDF2IMAGE_AVAILABLE, VISION_MAX_PAGES, VISION_DPI,
+    vision_enabled, get_vision_client, process_image_with_vision, extract_text_with_vision_model,
+)
 
 CUSTOM_MODULES_AVAILABLE = False
 # Custom modules
 try:
     from database import Database
-    from auth import init_auth, requires_auth, get_user
+    from auth import AUTHLIB_AVAILABLE, init_auth, get_oauth, requires_auth, get_user
+    if not AUTHLIB_AVAILABLE:
+        raise ImportError("authlib is not installed")
     CUSTOM_MODULES_AVAILABLE = True
 except ImportError:
     logger.warning("Custom modules (database, auth) not available. Running in demo mode.")
@@ -61,21 +60,61 @@ except ImportError:
 # Configuration
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg'}
 MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
-UPLOAD_FOLDER = 'uploads'
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-app = Flask(__name__, static_folder='static', static_url_path='')
-app.secret_key = os.environ.get('SECRET_KEY', os.urandom(24).hex())
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+HISTORY_MAX_MESSAGES = int(os.environ.get('CONTEXT_MAX_MESSAGES', 50))  # Newest messages considered per turn
+CONTEXT_MAX_TOKENS = int(os.environ.get('CONTEXT_MAX_TOKENS', 8000))  # Prompt budget incl. system prompt
+CONTEXT_MAX_MESSAGE_TOKENS = int(os.environ.get('CONTEXT_MAX_MESSAGE_TOKENS', 3000))  # Cap for any one message
+SUMMARY_INTERVAL = int(os.environ.get('SUMMARY_INTERVAL', 10))  # Messages between summary updates; 0 disables
+SUMMARY_KEEP_RECENT = int(os.environ.get('SUMMARY_KEEP_RECENT', 4))  # Newest messages never summarized
+SUMMARY_MAX_TOKENS = int(os.environ.get('SUMMARY_MAX_TOKENS', 400))
+PAGE_SIZE_DEFAULT = 50
+PAGE_SIZE_MAX = 200
+UPLOAD_SPOOL_THRESHOLD = int(os.environ.get('UPLOAD_SPOOL_THRESHOLD', 4 * 1024 * 1024))  # Larger uploads spool to disk
+EXTRACTOR_VERSION = 1  # Bump when extraction output changes to invalidate cached text
+EXTRACTION_CACHE_DIR = os.environ.get('EXTRACTION_CACHE_DIR', 'extraction_cache')
+EXTRACTION_CACHE_MAX_BYTES = int(os.environ.get('EXTRACTION_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI', 'sqlite:///rate_limits.db')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # Bearer token required by /metrics when set
+METRICS_DIR = os.environ.get('METRICS_DIR')  # Shared by worker processes so /metrics sums them all
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+
+class SpoolingRequest(Request):
+    # Uploaded files are hashed and size-checked as Werkzeug streams them in, stay
+    # in memory up to UPLOAD_SPOOL_THRESHOLD and spool to a temp file beyond it.
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return UploadSpool(UPLOAD_SPOOL_THRESHOLD, MAX_FILE_SIZE)
+
+# Without SECRET_KEY each process signs sessions with its own random key, so
+# multi-worker deployments must set it (or preload the app, see gunicorn.conf.py).
+SECRET_KEY = os.environ.get('SECRET_KEY', os.urandom(24).hex())
+
+# Routes live on a blueprint; create_app() builds and configures the Flask app.
+bp = Blueprint('main', __name__)
+
+# Opt-in startup warm-up (see warm_up below and gunicorn.conf.py), reported on /api/health
+WARMUP = os.environ.get('WARMUP', 'false').lower() == 'true'
+warmup_status = {'enabled': WARMUP, 'completed': False, 'duration_ms': None, 'steps': {}}
+
+extraction_service = create_extraction_service()
+
+document_cache = (
+    extraction_cache.ExtractionCache(EXTRACTION_CACHE_DIR, EXTRACTION_CACHE_MAX_BYTES)
+    if EXTRACTION_CACHE_DIR else None
+)
 
-CORS(app, supports_credentials=True, origins=["http://localhost:5000"])
+def rate_limit_key():
+    # Limits follow the account, not the address, so users behind one NAT do not
+    # share a budget; anonymous requests fall back to the client address.
+    return f"user:{get_user_id()}" if get_user() else get_remote_address()
 
+# Counters live in RATELIMIT_STORAGE_URI so all workers share them (see rate_limit.py).
+# If that store is unreachable, each worker falls back to in-memory counters.
 limiter = Limiter(
-    get_remote_address,
-    app=app,
+    rate_limit_key,
     default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
+    storage_uri=RATELIMIT_STORAGE_URI,
+    in_memory_fallback_enabled=True,
 )
+SEND_MESSAGE_LIMIT = "10 per minute"  # Overrides default_limits; shared with the ASGI message route (asgi.py)
 
 # Demo mode database
 if not CUSTOM_MODULES_AVAILABLE:
@@ -83,12 +122,20 @@ if not CUSTOM_MODULES_AVAILABLE:
         def __init__(self):
             self.chats = {}
             self.messages = {}
+            self.summaries = {}
             self.next_chat_id = 1
             self.next_message_id = 1
         
         def get_all_chats(self, user_id):
             return [chat for chat in self.chats.values() if chat['user_id'] == user_id]
         
+        def get_chats_page(self, user_id, before=None, limit=50):
+            chats = sorted(self.get_all_chats(user_id), key=lambda chat: chat['id'], reverse=True)
+            if before is not None:
+                chats = [chat for chat in chats if chat['id'] < before]
+            next_cursor = chats[limit - 1]['id'] if len(chats) > limit else None
+            return chats[:limit], next_cursor
+        
         def create_chat(self, user_id, title):
             chat_id = self.next_chat_id
             self.chats[chat_id] = {
@@ -101,10 +148,21 @@ if not CUSTOM_MODULES_AVAILABLE:
             self.next_chat_id += 1
             return chat_id
         
+        def get_chat(self, chat_id, user_id):
+            chat = self.chats.get(chat_id)
+            return chat if chat and chat['user_id'] == user_id else None
+        
+        def update_chat_title(self, chat_id, user_id, title):
+            chat = self.get_chat(chat_id, user_id)
+            if chat:
+                chat['title'] = title
+            return bool(chat)
+        
         def delete_chat(self, chat_id, user_id):
             if chat_id in self.chats and self.chats[chat_id]['user_id'] == user_id:
                 del self.chats[chat_id]
                 del self.messages[chat_id]
+                self.summaries.pop(chat_id, None)
                 return True
             return False
         
@@ -113,6 +171,31 @@ if not CUSTOM_MODULES_AVAILABLE:
                 return self.messages.get(chat_id, [])
             return []
         
+        def get_messages_page(self, chat_id, user_id, before=None, limit=50):
+            messages = self.get_chat_messages(chat_id, user_id)
+            if before is not None:
+                messages = [msg for msg in messages if msg['id'] < before]
+            next_cursor = messages[-limit]['id'] if len(messages) > limit else None
+            return messages[-limit:], next_cursor
+        
+        def get_recent_messages(self, chat_id, user_id, limit=50, after_id=0):
+            messages = [msg for msg in self.get_chat_messages(chat_id, user_id) if msg['id'] > after_id]
+            return messages[-limit:]
+        
+        def get_messages_after(self, chat_id, user_id, after_id=0, limit=50):
+            return [msg for msg in self.get_chat_messages(chat_id, user_id) if msg['id'] > after_id][:limit]
+        
+        def get_chat_summary(self, chat_id, user_id):
+            if self.get_chat(chat_id, user_id):
+                return self.summaries.get(chat_id, (None, 0))
+            return (None, 0)
+        
+        def update_chat_summary(self, chat_id, user_id, summary, through_id):
+            if self.get_chat(chat_id, user_id) and self.get_chat_summary(chat_id, user_id)[1] < through_id:
+                self.summaries[chat_id] = (summary, through_id)
+                return True
+            return False
+        
         def add_message(self, chat_id, role, content, user_id):
             if chat_id in self.chats and self.chats[chat_id]['user_id'] == user_id:
                 message_id = self.next_message_id
@@ -139,27 +222,105 @@ if not CUSTOM_MODULES_AVAILABLE:
         def get_user():
             return {'sub': 'demo-user', 'name': 'Demo User', 'email': 'demo@example.com'}
     
-    oauth = DemoAuth()
-    requires_auth = oauth.requires_auth
-    get_user = oauth.get_user
+    demo_auth = DemoAuth()
+    requires_auth = demo_auth.requires_auth
+    get_user = demo_auth.get_user
 else:
     db = Database()
-    oauth = init_auth(app)
 
-# Gemini-only LLM client
+# Metrics, exposed on /metrics (see metrics.py)
+if METRICS_DIR:
+    metrics.configure(METRICS_DIR, METRICS_FLUSH_INTERVAL)
+DB_SECONDS = metrics.Histogram('chat_db_call_seconds', 'Database call latency.', ['method'])
+EXTRACTION_SECONDS = metrics.Histogram('chat_extraction_seconds', 'Document text extraction latency.', ['type'])
+LLM_CLIENT_SECONDS = metrics.Histogram('chat_llm_client_seconds', 'get_llm_client latency (registry lookup or construction).')
+LLM_FIRST_TOKEN_SECONDS = metrics.Histogram('chat_llm_time_to_first_token_seconds', 'Time from prompt to first streamed token.', ['model'])
+LLM_RESPONSE_SECONDS = metrics.Histogram('chat_llm_response_seconds', 'Time from prompt to last streamed token.', ['model'])
+LLM_TOKENS_PER_SECOND = metrics.Histogram(
+    'chat_llm_tokens_per_second', 'Output tokens per second after the first token (approximate tokens).', ['model'],
+    buckets=(5, 10, 25, 50, 100, 200, 400, 800, 1600),
+)
+LLM_RESPONSES = metrics.Counter('chat_llm_responses_total', 'LLM replies by outcome (ok, cache_hit, error).', ['model', 'outcome'])
+LLM_OUTPUT_TOKENS = metrics.Counter('chat_llm_output_tokens_total', 'Approximate output tokens streamed.', ['model'])
+HTTP_SECONDS = metrics.Histogram(
+    'chat_http_request_seconds', 'Time until the response starts (streams continue after it).', ['endpoint', 'method', 'status']
+)
+metrics.instrument_methods(db, DB_SECONDS, (
+    'create_chat', 'get_all_chats', 'get_chats_page', 'get_chat', 'update_chat_title', 'delete_chat',
+    'get_chat_messages', 'get_messages_page', 'get_recent_messages', 'get_messages_after', 'add_message',
+    'get_chat_summary', 'update_chat_summary',
+))
+
+class LLMResponseTimer:
+    """Records time to first token, throughput and total time of one reply."""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.started = time.perf_counter()
+        self.first_token_at = None
+        self.finished = False
+
+    def token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+            LLM_FIRST_TOKEN_SECONDS.observe(self.first_token_at - self.started, model=self.model_name)
+
+    def finish(self, outcome, text=''):
+        # Only the first outcome counts, e.g. a failure persisting an already streamed reply.
+        if self.finished:
+            return
+        self.finished = True
+        finished = time.perf_counter()
+        LLM_RESPONSES.inc(model=self.model_name, outcome=outcome)
+        if outcome != 'ok':
+            return
+        LLM_RESPONSE_SECONDS.observe(finished - self.started, model=self.model_name)
+        tokens = count_tokens(text)
+        LLM_OUTPUT_TOKENS.inc(tokens, model=self.model_name)
+        if self.first_token_at is not None and finished > self.first_token_at:
+            LLM_TOKENS_PER_SECOND.observe(tokens / (finished - self.first_token_at), model=self.model_name)
+
+# Gemini-only LLM client, cached per (model, params) in the process-wide registry
+@metrics.timed(LLM_CLIENT_SECONDS)
 def get_llm_client(model_name="gemini-2.5-flash-lite"):
+    if os.getenv("LLM_PROVIDER") == "fake":
+        from fake_llm import FakeChatModel
+        return llm_registry.get(
+            'fake',
+            model_name,
+            FakeChatModel,
+            latency=float(os.getenv('FAKE_LLM_LATENCY', 0)),
+            token_delay=float(os.getenv('FAKE_LLM_TOKEN_DELAY', 0)),
+        )
+    
     gemini_api_key = os.getenv("GEMINI_API_KEY")
     if not gemini_api_key:
         raise ValueError("GEMINI_API_KEY not set. Get one from https://aistudio.google.com/app/apikey")
     
-    return ChatGoogleGenerativeAI(
-        model=model_name,  # Updated to Gemini 2.5 Flash-Lite
+    # Imported here: the Gemini SDK is most of the app's import time.
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return llm_registry.get(
+        'google',
+        model_name,  # Updated to Gemini 2.5 Flash-Lite
+        ChatGoogleGenerativeAI,
         google_api_key=gemini_api_key,
         temperature=0.7,
         top_p=0.9,
         max_tokens=1024,
     )
 
+# Opt-in exact-match cache of completions (RESPONSE_CACHE=memory|sqlite)
+response_cache = create_response_cache(
+    os.environ.get('RESPONSE_CACHE', 'off'),
+    ttl=int(os.environ.get('RESPONSE_CACHE_TTL', 3600)),
+    max_entries=int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1000)),
+    max_bytes=int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+    path=os.environ.get('RESPONSE_CACHE_PATH', 'response_cache.db'),
+)
+
+# Packs the newest turns into CONTEXT_MAX_TOKENS, truncating oversized documents
+context_builder = ContextBuilder(CONTEXT_MAX_TOKENS, CONTEXT_MAX_MESSAGE_TOKENS)
+
 # Gemini-like system prompt
 SYSTEM_PROMPT = """
 You are Gemini, created by Google. Your role is to provide clear, accurate, and helpful answers to user questions. Use a friendly, conversational tone with a touch of wit. Adapt your response length and depth to the query: keep it concise for simple questions and provide detailed reasoning for complex ones. Use provided chat history or file content to inform your answers. If a file is uploaded, summarize or analyze its content to address the user's request. If you don't know the answer, admit it and suggest alternatives. Stay focused on the user's query and avoid irrelevant details.
@@ -167,6 +328,8 @@ You are Gemini, created by Google. Your role is to provide clear, accurate, and
 
 # Title generator (Runnable pipeline)
 def get_title_chain():
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
     llm = get_llm_client()
     prompt = ChatPromptTemplate.from_messages([
         ("system", "Summarize this message into a concise chat title (max 50 characters):"),
@@ -174,133 +337,269 @@ def get_title_chain():
     ])
     return prompt | llm | StrOutputParser()
 
+def generate_chat_title(text):
+    return get_title_chain().invoke({"input": text}).strip()[:50]
+
+# Titles are generated off the request path; create_chat returns immediately.
+title_worker = TitleWorker(
+    generate_chat_title,
+    db.update_chat_title,
+    workers=int(os.environ.get('TITLE_WORKERS', 2)),
+    max_pending=int(os.environ.get('TITLE_QUEUE_SIZE', 100)),
+)
+atexit.register(title_worker.shutdown)
+
+# Rolling summary (Runnable pipeline) of turns that have left the context window
+def get_summary_chain():
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+    llm = get_llm_client()
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "Update the running summary of this conversation with the new messages. "
+                   "Keep facts, decisions, names and open questions; drop pleasantries. "
+                   f"Reply with the summary only, under {SUMMARY_MAX_TOKENS * 3 // 4} words."),
+        ("human", "Current summary:\n{summary}\n\nNew messages:\n{transcript}")
+    ])
+    return prompt | llm | StrOutputParser()
+
+def generate_chat_summary(summary, transcript):
+    text = get_summary_chain().invoke({"summary": summary or "(none)", "transcript": transcript})
+    return truncate_to_tokens(text.strip(), SUMMARY_MAX_TOKENS)
+
+# Every SUMMARY_INTERVAL messages, older turns are folded into chats.summary off the request path.
+summary_worker = SummaryWorker(
+    db,
+    generate_chat_summary,
+    interval=SUMMARY_INTERVAL,
+    keep_recent=SUMMARY_KEEP_RECENT,
+    batch_size=HISTORY_MAX_MESSAGES,
+    max_message_tokens=CONTEXT_MAX_MESSAGE_TOKENS,
+    workers=int(os.environ.get('SUMMARY_WORKERS', 1)),
+    max_pending=int(os.environ.get('SUMMARY_QUEUE_SIZE', 100)),
+)
+atexit.register(summary_worker.shutdown)
+
 def get_user_id():
     user = get_user()
     return user['sub'] if user and 'sub' in user else 'demo-user'
 
+def get_page_args():
+    before = request.args.get('before', type=int)
+    limit = request.args.get('limit', PAGE_SIZE_DEFAULT, type=int)
+    return before, max(1, min(limit, PAGE_SIZE_MAX))
+
+def validate_message_payload(data):
+    """Return an error message for an invalid send-message body, else None."""
+    if not data:
+        return 'Invalid JSON'
+    user_message = data.get('message')
+    if not user_message:
+        return 'Message is required'
+    if not isinstance(user_message, str):
+        return 'Message must be a string'
+    if len(user_message) > 4000:
+        return 'Message exceeds 4000 characters'
+    return None
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-# File extraction functions (text-only; vision disabled)
-def extract_text_from_pdf(filepath):
-    if not PDF_MINER_AVAILABLE:
-        raise Exception("PDF processing requires pdfminer.six")
-    try:
-        rsrcmgr = PDFResourceManager()
-        retstr = StringIO()
-        laparams = LAParams()
-        device = TextConverter(rsrcmgr, retstr, laparams=laparams)
-        with open(filepath, 'rb') as fp:
-            interpreter = PDFPageInterpreter(rsrcmgr, device)
-            for page in PDFPage.get_pages(fp):
-                interpreter.process_page(page)
-            text = retstr.getvalue()
-        device.close()
-        retstr.close()
-        return text.strip()[:10000]  # Limit to 10k chars
-    except Exception as e:
-        logger.error(f"PDF processing error: {str(e)}")
-        raise Exception(f"Failed to process PDF: {str(e)}")
+def read_bytes(file_content):
+    if isinstance(file_content, (str, os.PathLike)):
+        with open(file_content, 'rb') as f:
+            return f.read()
+    if hasattr(file_content, 'read'):
+        return as_binary_stream(file_content).read()
+    return bytes(file_content)
 
+# File extraction functions
 def extract_text_from_file(file_content, filename, use_vision_model=False):
+    """``file_content`` may be a path, bytes, a memoryview or a seekable binary file object.
+
+    PDFs are parsed in the extraction process pool; plain text is decoded inline
+    since it costs less than the round trip to a worker.
+    """
     file_extension = filename.rsplit('.', 1)[1].lower()
-    if file_extension == 'txt':
-        try:
-            encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-            for encoding in encodings:
+    with EXTRACTION_SECONDS.time(type=file_extension):
+        if file_extension == 'txt':
+            return extract_text_from_txt(file_content)
+        elif file_extension in ['png', 'jpg', 'jpeg']:
+            vision_client = get_vision_client(SYSTEM_PROMPT)
+            if vision_client is None:
+                raise Exception("Image uploads require a vision model (set VISION_API_BASE)")
+            return process_image_with_vision(vision_client, read_bytes(file_content), filename)
+        elif file_extension == 'pdf':
+            if use_vision_model and PDF2IMAGE_AVAILABLE and vision_enabled():
+                file_content = read_bytes(file_content)
                 try:
-                    return file_content.decode(encoding)[:10000]
-                except UnicodeDecodeError:
-                    continue
-            raise Exception("Could not decode text file")
-        except Exception as e:
-            logger.error(f"Text file error: {str(e)}")
-            raise Exception(f"Failed to process text file: {str(e)}")
-    elif file_extension == 'pdf':
-        if not PDF_MINER_AVAILABLE:
-            raise Exception("PDF processing requires pdfminer.six")
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            temp_file.write(file_content)
-            temp_path = temp_file.name
-        try:
-            return extract_text_from_pdf(temp_path)
-        finally:
-            try:
-                os.unlink(temp_path)
-            except:
-                logger.warning(f"Failed to delete temp file: {temp_path}")
-    else:
-        raise Exception(f"Unsupported file type: {file_extension}")
-
-# Replace the existing generate_llm_response function in app.py
-def generate_llm_response(chat_id, user_id, messages, model_name="gemini-2.5-flash-lite"):
+                    return extract_text_with_vision_model(get_vision_client(SYSTEM_PROMPT), file_content)
+                except Exception as vision_error:
+                    logger.warning("Vision extraction failed: %s", vision_error)
+            if not PDF_MINER_AVAILABLE:
+                raise Exception("PDF processing requires pdfminer.six")
+            # Workers get a path for spooled uploads so large files are never held in memory.
+            if isinstance(file_content, (str, os.PathLike)):
+                return extraction_service.run(extract_text_from_pdf, os.fspath(file_content))
+            if hasattr(file_content, 'read'):
+                file_content = as_binary_stream(file_content).read()
+            return extraction_service.run(extract_text_from_pdf, bytes(file_content))
+        else:
+            raise Exception(f"Unsupported file type: {file_extension}")
+
+def extract_text_cached(file_content, filename, use_vision_model=False, digest=None):
+    """extract_text_from_file, memoized on disk by content hash and extractor version.
+
+    Pass ``digest`` (SHA-256 hex of the file) when it is already known, as it is
+    for uploads, to avoid hashing the content a second time.
+    """
+    if document_cache is None:
+        return extract_text_from_file(file_content, filename, use_vision_model)
+    file_extension = filename.rsplit('.', 1)[1].lower()
+    if digest is None:
+        digest = document_cache.digest(file_content)
+    # Limits are part of the version so changing them never serves stale truncations.
+    version = f"{EXTRACTOR_VERSION}.{EXTRACT_MAX_CHARS}.{PDF_MAX_PAGES}"
+    if use_vision_model or file_extension in ['png', 'jpg', 'jpeg']:
+        version += f".vision{VISION_MAX_PAGES}.{VISION_DPI}"
+    key = extraction_cache.make_cache_key(digest, file_extension, version)
+    text = document_cache.get(key)
+    if text is not None:
+        logger.debug("Extraction cache hit for %s", filename)
+        return text
+    text = extract_text_from_file(file_content, filename, use_vision_model)
+    document_cache.set(key, text)
+    return text
+
+def sse_event(payload):
+    return f"data: {json.dumps(payload)}\n\n"
+
+def build_llm_prompt(messages, model_name, summary=None):
+    """Return ``(langchain_messages, cache_key)`` for a turn.
+
+    ``messages`` are the turns after the chat's rolling ``summary``, which is
+    sent ahead of them when present. ``cache_key`` is None with no response cache.
+    """
+    from langchain_core.messages import SystemMessage, HumanMessage
+    prompt_messages = [SystemMessage(content=SYSTEM_PROMPT)]
+    if summary:
+        summary = f"Summary of the earlier conversation:\n{summary}"
+        prompt_messages.append(SystemMessage(content=summary))
+    window = context_builder.build(messages, SYSTEM_PROMPT, count_tokens(summary))
+    cache_key = make_cache_key(model_name, SYSTEM_PROMPT + (summary or ''), window) if response_cache else None
+    langchain_messages = prompt_messages + [
+        HumanMessage(content=msg['content']) if msg['role'] == 'user' else SystemMessage(content=msg['content'])
+        for msg in window
+    ]
+    return langchain_messages, cache_key
+
+def generate_llm_response(chat_id, user_id, messages, model_name="gemini-2.5-flash-lite", summary=None):
+    """Yield SSE frames as the model streams; persist the reply once complete."""
+    timer = LLMResponseTimer(model_name)
     try:
-        logger.debug(f"Sending LLM request with model: {model_name}, messages count: {len(messages)}")
-        llm = get_llm_client(model_name)
-        langchain_messages = [SystemMessage(content=SYSTEM_PROMPT)] + [
-            HumanMessage(content=msg['content']) if msg['role'] == 'user' else SystemMessage(content=msg['content'])
-            for msg in messages[-5:]
-        ]
-        full_response = ""
-        if hasattr(llm, 'stream'):
-            for chunk in llm.stream(langchain_messages):
-                content = chunk.content if hasattr(chunk, 'content') else chunk
-                if content:
-                    full_response += content
+        langchain_messages, cache_key = build_llm_prompt(messages, model_name, summary)
+        cached = response_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            logger.debug("Response cache hit for chat %s", chat_id)
+            full_response = cached
+            timer.finish('cache_hit')
+            yield sse_event({'content': cached})
         else:
-            response = llm.invoke(langchain_messages)
-            content = response.content if hasattr(response, 'content') else response
-            full_response += content
-        logger.debug(f"Full LLM response: {full_response[:200]}...")
+            logger.debug("Sending LLM request with model: %s, messages count: %d", model_name, len(messages))
+            llm = get_llm_client(model_name)
+            full_response = ""
+            if hasattr(llm, 'stream'):
+                for chunk in llm.stream(langchain_messages):
+                    content = chunk.content if hasattr(chunk, 'content') else chunk
+                    if content:
+                        timer.token()
+                        full_response += content
+                        yield sse_event({'content': content})
+            else:
+                response = llm.invoke(langchain_messages)
+                content = response.content if hasattr(response, 'content') else response
+                timer.token()
+                full_response += content
+                yield sse_event({'content': content})
+            timer.finish('ok', full_response)
+            if cache_key and full_response:
+                response_cache.set(cache_key, full_response)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Full LLM response: %s...", full_response[:200])
         db.add_message(chat_id, 'assistant', full_response, user_id)
-        return jsonify({'content': full_response, 'done': True})
+        if summary_worker.due(len(messages) + 1):
+            summary_worker.submit(chat_id, user_id)
+        yield sse_event({'done': True})
     except Exception as e:
-        logger.error(f"LLM streaming error for {model_name}: {str(e)}")
-        return jsonify({'error': f'LLM error ({model_name}): {str(e)})'}), 500
+        logger.error("LLM streaming error for %s: %s", model_name, e)
+        timer.finish('error')
+        yield sse_event({'error': f'LLM error ({model_name}): {str(e)}'})
+
+def stream_llm_response(chat_id, user_id, messages, model_name="gemini-2.5-flash-lite", summary=None):
+    return Response(
+        stream_with_context(generate_llm_response(chat_id, user_id, messages, model_name, summary)),
+        mimetype='text/event-stream',
+        # X-Accel-Buffering stops nginx-style proxies from holding back frames
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 # Routes
-@app.route('/')
+@bp.before_app_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@bp.after_app_request
+def record_request_time(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        HTTP_SECONDS.observe(
+            time.perf_counter() - started,
+            endpoint=request.endpoint or 'unmatched', method=request.method, status=response.status_code,
+        )
+    return response
+
+@bp.route('/')
 def index():
     user = get_user()
     if not user:
-        return app.send_static_file('new_landing_page.html')
-    return redirect(url_for('chat'))
+        return current_app.send_static_file('new_landing_page.html')
+    return redirect(url_for('main.chat'))
 
-@app.route('/chat')
+@bp.route('/chat')
 def chat():
-    return app.send_static_file('index.html')
+    return current_app.send_static_file('index.html')
 
-@app.route('/api/auth/user')
+@bp.route('/api/auth/user')
 def auth_user():
     user = get_user()
     return jsonify({'authenticated': bool(user), 'user': user or {}})
 
-@app.route('/api/auth/login')
+@bp.route('/api/auth/login')
 def login():
     if not CUSTOM_MODULES_AVAILABLE:
         return jsonify({'error': 'Authentication not available in demo mode'}), 400
-    redirect_uri = url_for('callback', _external=True)
-    return oauth.auth0.authorize_redirect(redirect_uri)
+    redirect_uri = url_for('main.callback', _external=True)
+    return get_oauth().auth0.authorize_redirect(redirect_uri)
 
-@app.route('/api/auth/signup')
+@bp.route('/api/auth/signup')
 def signup():
     if not CUSTOM_MODULES_AVAILABLE:
         return jsonify({'error': 'Authentication not available in demo mode'}), 400
-    redirect_uri = url_for('callback', _external=True)
-    return oauth.auth0.authorize_redirect(redirect_uri, screen_hint='signup')
+    redirect_uri = url_for('main.callback', _external=True)
+    return get_oauth().auth0.authorize_redirect(redirect_uri, screen_hint='signup')
 
-@app.route('/api/auth/callback')
+@bp.route('/api/auth/callback')
 def callback():
     if not CUSTOM_MODULES_AVAILABLE:
         return jsonify({'error': 'Authentication not available in demo mode'}), 400
     try:
-        token = oauth.auth0.authorize_access_token()
+        token = get_oauth().auth0.authorize_access_token()
         session['user'] = token['userinfo']
         return redirect('/chat')
     except Exception as e:
-        logger.error(f"Auth callback error: {str(e)}")
+        logger.error("Auth callback error: %s", e)
         return jsonify({'error': str(e)}), 400
 
-@app.route('/api/auth/logout')
+@bp.route('/api/auth/logout')
 def logout():
     session.clear()
     if CUSTOM_MODULES_AVAILABLE:
@@ -308,36 +607,41 @@ def logout():
         return redirect(
             f'https://{auth0_domain}/v2/logout?' + 
             urlencode({
-                'returnTo': url_for('index', _external=True),
+                'returnTo': url_for('main.index', _external=True),
                 'client_id': os.environ.get('AUTH0_CLIENT_ID')
             }, quote_via=quote_plus)
         )
-    return redirect(url_for('landing_page'))
+    return redirect(url_for('main.index'))
 
-@app.route('/api/chats', methods=['GET'])
+@bp.route('/api/chats', methods=['GET'])
 @requires_auth
 def get_chats():
     user_id = get_user_id()
-    return jsonify(db.get_all_chats(user_id))
+    before, limit = get_page_args()
+    chats, next_cursor = db.get_chats_page(user_id, before, limit)
+    return jsonify({'chats': chats, 'next_cursor': next_cursor})
 
-@app.route('/api/chats', methods=['POST'])
+@bp.route('/api/chats', methods=['POST'])
 @requires_auth
 def create_chat():
     user_id = get_user_id()
     data = request.get_json(silent=True) or {}
     title = data.get('title', 'New Chat')
     initial_message = data.get('initial_message')
-    model_name = 'gemini-2.5-flash-lite'  # Updated to Gemini 2.5 Flash-Lite
-    if initial_message:
-        try:
-            title_gen = get_title_chain()
-            title = title_gen.invoke({"input": initial_message})[:50]
-        except Exception as e:
-            logger.warning(f"Failed to generate chat title: {e}")
     chat_id = db.create_chat(user_id, title)
-    return jsonify({'id': chat_id, 'title': title})
+    title_pending = bool(initial_message) and title_worker.submit(chat_id, user_id, initial_message)
+    return jsonify({'id': chat_id, 'title': title, 'title_pending': title_pending})
+
+@bp.route('/api/chats/<int:chat_id>', methods=['GET'])
+@requires_auth
+def get_chat(chat_id):
+    user_id = get_user_id()
+    chat = db.get_chat(chat_id, user_id)
+    if not chat:
+        return jsonify({'error': 'Chat not found or access denied'}), 404
+    return jsonify(chat)
 
-@app.route('/api/chats/<int:chat_id>', methods=['DELETE'])
+@bp.route('/api/chats/<int:chat_id>', methods=['DELETE'])
 @requires_auth
 def delete_chat(chat_id):
     user_id = get_user_id()
@@ -345,36 +649,33 @@ def delete_chat(chat_id):
         return jsonify({'success': True})
     return jsonify({'error': 'Chat not found or access denied'}), 403
 
-@app.route('/api/chats/<int:chat_id>/messages', methods=['GET'])
+@bp.route('/api/chats/<int:chat_id>/messages', methods=['GET'])
 @requires_auth
 def get_messages(chat_id):
     user_id = get_user_id()
-    return jsonify(db.get_chat_messages(chat_id, user_id))
+    before, limit = get_page_args()
+    messages, next_cursor = db.get_messages_page(chat_id, user_id, before, limit)
+    return jsonify({'messages': messages, 'next_cursor': next_cursor})
 
-@app.route('/api/chats/<int:chat_id>/messages', methods=['POST'])
+@bp.route('/api/chats/<int:chat_id>/messages', methods=['POST'])
 @requires_auth
-@limiter.limit("10 per minute")
+@limiter.limit(SEND_MESSAGE_LIMIT)
 def send_message(chat_id):
     user_id = get_user_id()
     data = request.get_json(silent=True)
-    if not data:
-        return jsonify({'error': 'Invalid JSON'}), 400
-    user_message = data.get('message')
+    error = validate_message_payload(data)
+    if error:
+        return jsonify({'error': error}), 400
+    user_message = data['message']
     model_name = 'gemini-2.5-flash-lite'
-    if not user_message:
-        return jsonify({'error': 'Message is required'}), 400
-    if not isinstance(user_message, str):
-        return jsonify({'error': 'Message must be a string'}), 400
-    if len(user_message) > 4000:
-        return jsonify({'error': 'Message exceeds 4000 characters'}), 400
     message_id = db.add_message(chat_id, 'user', user_message, user_id)
     if not message_id:
         return jsonify({'error': 'Chat not found or access denied'}), 403
-    chat_messages = db.get_chat_messages(chat_id, user_id)
-    api_messages = [{'role': msg['role'], 'content': msg['content']} for msg in chat_messages]
-    return generate_llm_response(chat_id, user_id, api_messages, model_name)
+    summary, summary_through = db.get_chat_summary(chat_id, user_id)
+    chat_messages = db.get_recent_messages(chat_id, user_id, HISTORY_MAX_MESSAGES, summary_through)
+    return stream_llm_response(chat_id, user_id, chat_messages, model_name, summary)
 
-@app.route('/api/chats/<int:chat_id>/upload', methods=['POST'])
+@bp.route('/api/chats/<int:chat_id>/upload', methods=['POST'])
 @requires_auth
 @limiter.limit("10 per minute")
 def upload_file(chat_id):
@@ -386,17 +687,13 @@ def upload_file(chat_id):
         return jsonify({'error': 'No selected file'}), 400
     if not allowed_file(file.filename):
         return jsonify({'error': f'Allowed types: {", ".join(ALLOWED_EXTENSIONS)}'}), 400
-    file_content = file.read()
-    if len(file_content) > MAX_FILE_SIZE:
-        return jsonify({'error': f'File too large (max {MAX_FILE_SIZE // (1024*1024)}MB)'}), 400
-    secure_path = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(file.filename))
-    with open(secure_path, 'wb') as f:
-        f.write(file_content)
+    # The body was hashed and size-checked while it streamed in (see UploadSpool).
+    upload = file.stream
     try:
         user_message = request.form.get('message', '').strip()
-        use_vision_model = False
+        use_vision_model = request.form.get('use_vision', 'false').lower() == 'true' and vision_enabled()
         model_name = 'gemini-2.5-flash-lite'
-        extracted_content = extract_text_from_file(file_content, file.filename, use_vision_model)
+        extracted_content = extract_text_cached(upload.source(), file.filename, use_vision_model, upload.hexdigest())
         if not extracted_content and not user_message:
             return jsonify({'error': 'No content extracted and no message provided'}), 400
         file_extension = file.filename.rsplit('.', 1)[1].lower()
@@ -409,22 +706,28 @@ def upload_file(chat_id):
         message_id = db.add_message(chat_id, 'user', combined_message, user_id)
         if not message_id:
             return jsonify({'error': 'Chat not found or access denied'}), 400
-        chat_messages = db.get_chat_messages(chat_id, user_id)
-        api_messages = [{'role': msg['role'], 'content': msg['content']} for msg in chat_messages]
-        return generate_llm_response(chat_id, user_id, api_messages, model_name)
+        summary, summary_through = db.get_chat_summary(chat_id, user_id)
+        chat_messages = db.get_recent_messages(chat_id, user_id, HISTORY_MAX_MESSAGES, summary_through)
+        return stream_llm_response(chat_id, user_id, chat_messages, model_name, summary)
+    except ExtractionSaturated as e:
+        logger.warning("File upload rejected: %s", e)
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+    except ExtractionTimeout as e:
+        logger.warning("File upload timed out: %s", e)
+        return jsonify({'error': str(e)}), 504
+    except ExtractionTooLarge as e:
+        logger.warning("File upload rejected: %s", e)
+        return jsonify({'error': str(e)}), 413
     except Exception as e:
-        logger.error(f"File upload error: {str(e)}")
+        logger.error("File upload error: %s", e)
         return jsonify({'error': str(e)}), 400
-    finally:
-        if os.path.exists(secure_path):
-            os.remove(secure_path)
-@app.route('/api/models')
+@bp.route('/api/models')
 def get_models():
     return jsonify([
         {'id': 'gemini-2.5-flash-lite', 'name': 'Gemini 2.5 Flash-Lite (Google)', 'description': 'Fast, cost-efficient conversational AI', 'type': 'text', 'provider': 'google'}
     ])
 
-@app.route('/api/health')
+@bp.route('/api/health')
 def health_check():
     return jsonify({
         'status': 'healthy',
@@ -434,33 +737,123 @@ def health_check():
         'langchain_providers': {
             'google': bool(os.getenv("GEMINI_API_KEY")),
         },
+        'response_cache': response_cache.info() if response_cache else {'enabled': False},
+        'warmup': warmup_status,
         'features': {
             'file_upload': True,
-            'vision_processing': False,  # Disabled
+            'vision_processing': PDF2IMAGE_AVAILABLE and vision_enabled(),
             'streaming': True,
             'langchain': True,
             'authentication': CUSTOM_MODULES_AVAILABLE
         }
     })
 
-@app.errorhandler(404)
+@bp.route('/metrics')
+@limiter.exempt
+def metrics_endpoint():
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return jsonify({'error': 'Authentication required'}), 401
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@bp.app_errorhandler(404)
 def not_found_error(error):
-    logger.error(f"404 error: {str(error)}")
+    logger.error("404 error: %s", error)
     return jsonify({'error': 'Not Found', 'message': str(error)}), 404
 
-@app.errorhandler(429)
+@bp.app_errorhandler(413)
+def request_too_large_error(error):
+    logger.warning("Request body too large")
+    return jsonify({'error': f'File too large (max {MAX_FILE_SIZE // (1024*1024)}MB)'}), 413
+
+@bp.app_errorhandler(429)
 def ratelimit_error(error):
     logger.warning("Rate limit exceeded")
     return jsonify({'error': 'Rate limit exceeded', 'message': 'Too many requests'}), 429
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def internal_error(error):
-    logger.error(f"500 error: {str(error)}")
+    logger.error("500 error: %s", error)
     return jsonify({'error': 'Internal Server Error', 'message': str(error)}), 500
 
+def create_app(config=None):
+    """Build the Flask app. Process-wide services (db, workers, caches) are shared by every app."""
+    app = Flask(__name__, static_folder='static', static_url_path='')
+    app.request_class = SpoolingRequest
+    app.secret_key = SECRET_KEY
+    # Reject oversized bodies from Content-Length before any of the body is read;
+    # the allowance covers multipart boundaries and the optional message field.
+    app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE + 64 * 1024
+    if config:
+        app.config.update(config)
+    CORS(app, supports_credentials=True, origins=["http://localhost:5000"])
+    limiter.init_app(app)
+    if CUSTOM_MODULES_AVAILABLE:
+        init_auth(app)
+    app.register_blueprint(bp)
+    return app
+
+def preload_modules():
+    """Import the lazily loaded dependencies. Starts no threads, so it is safe before fork."""
+    import importlib
+    modules = ['langchain_core.messages', 'langchain_core.prompts', 'langchain_core.output_parsers']
+    modules.append('fake_llm' if os.getenv("LLM_PROVIDER") == "fake" else 'langchain_google_genai')
+    if PDF_MINER_AVAILABLE:
+        modules.extend(PDF_MINER_MODULES)
+    if PDF2IMAGE_AVAILABLE and vision_enabled():
+        modules.append('pdf2image')
+    if CUSTOM_MODULES_AVAILABLE:
+        modules.append('authlib.integrations.flask_client')
+    for name in modules:
+        importlib.import_module(name)
+
+def warm_up(app):
+    """Build the per-process state a worker's first request would otherwise pay for.
+
+    Run once per worker after fork (gunicorn's post_fork hook) when WARMUP=true.
+    A failing step is logged and reported on /api/health; the rest still run.
+    """
+    if warmup_status['completed']:
+        return
+    def step(name, fn):
+        step_started = time.perf_counter()
+        try:
+            fn()
+            warmup_status['steps'][name] = round((time.perf_counter() - step_started) * 1000, 1)
+        except Exception as e:
+            logger.warning("Warm-up step %s failed: %s", name, e)
+            warmup_status['steps'][name] = f'error: {str(e)}'
+
+    def auth_client():
+        with app.app_context():
+            get_oauth()
+
+    started = time.perf_counter()
+    step('imports', preload_modules)
+    step('llm_client', lambda: (get_llm_client(), get_title_chain(), get_summary_chain()))
+    step('prompt', lambda: build_llm_prompt([{'role': 'user', 'content': 'warm-up'}], "gemini-2.5-flash-lite"))
+    if hasattr(db, 'warm_up'):
+        step('database', db.warm_up)
+    if PDF_MINER_AVAILABLE:
+        step('extraction_workers', lambda: extraction_service.warm_up(('extraction',) + PDF_MINER_MODULES))
+    if vision_enabled():
+        step('vision_client', lambda: get_vision_client(SYSTEM_PROMPT))
+    if CUSTOM_MODULES_AVAILABLE:
+        step('auth', auth_client)
+    warmup_status['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    warmup_status['completed'] = True
+    logger.info("Warm-up finished in %sms: %s", warmup_status['duration_ms'], warmup_status['steps'])
+
 if __name__ == '__main__':
     logger.info("Starting AI Chat Application with Gemini 2.5 Flash-Lite (Google) only...")
-    logger.info(f"Demo Mode: {not CUSTOM_MODULES_AVAILABLE}")
-    logger.info(f"PDF Miner Available: {PDF_MINER_AVAILABLE}")
-    logger.info(f"Vision Processing Available: {False}")
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    logger.info("Demo Mode: %s", not CUSTOM_MODULES_AVAILABLE)
+    logger.info("PDF Miner Available: %s", PDF_MINER_AVAILABLE)
+    logger.info("Vision Processing Available: %s", PDF2IMAGE_AVAILABLE and vision_enabled())
+    # Development server only; production runs gunicorn with gunicorn.conf.py (see wsgi.py).
+    app = create_app()
+    if WARMUP:
+        warm_up(app)
+    app.run(
+        host='0.0.0.0',
+        port=int(os.environ.get('PORT', 5000)),
+        debug=os.environ.get('FLASK_DEBUG', '0') == '1',
+    )
\ No newline at end of file
@@ -0,0 +1,194 @@
+"""ASGI entry point for high-concurrency serving.
+
+Sending a chat message is handled natively on the event loop: the reply is
+streamed with ``llm.astream`` and SQLite is reached through AsyncDatabase, so a
+streaming chat costs a coroutine rather than a worker thread and one process
+can hold thousands of them. Every other route is the unchanged Flask app,
+run on a thread by asgiref.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import json
+import logging
+import re
+from http.cookies import SimpleCookie
+
+from asgiref.wsgi import WsgiToAsgi
+from limits import parse as parse_limit
+from limits.errors import StorageError
+
+import app as chat_app
+from database import AsyncDatabase
+
+logger = logging.getLogger(__name__)
+
+def _as_tuple(exceptions):
+    return exceptions if isinstance(exceptions, tuple) else (exceptions,)
+
+MESSAGE_ROUTE = re.compile(r'^/api/chats/(\d+)/messages/?$')
+MAX_BODY_BYTES = 64 * 1024
+
+SSE_HEADERS = [
+    (b'content-type', b'text/event-stream; charset=utf-8'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no'),
+]
+
+async def send_json(send, status, payload):
+    body = json.dumps(payload).encode()
+    await send({'type': 'http.response.start', 'status': status, 'headers': [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(body)).encode()),
+    ]})
+    await send({'type': 'http.response.body', 'body': body})
+
+async def read_body(receive, limit=MAX_BODY_BYTES):
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        body += message.get('body', b'')
+        if len(body) > limit:
+            return None
+        if not message.get('more_body'):
+            return bytes(body)
+
+class ChatASGI:
+    """Routes POST /api/chats/<id>/messages to the async handler, the rest to Flask."""
+
+    def __init__(self, flask_app=None, database=None):
+        self.flask_app = flask_app or chat_app.create_app()
+        self.db = AsyncDatabase(database or chat_app.db)
+        self.wsgi = WsgiToAsgi(self.flask_app)
+        self.rate_limit = parse_limit(chat_app.SEND_MESSAGE_LIMIT)
+        self._sessions = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] == 'http' and scope['method'] == 'POST':
+            match = MESSAGE_ROUTE.match(scope['path'])
+            if match:
+                return await self.send_message(scope, receive, send, int(match.group(1)))
+        return await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        # Startup runs in each server process, so this is where WARMUP applies under uvicorn.
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if chat_app.WARMUP:
+                    await asyncio.to_thread(chat_app.warm_up, self.flask_app)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def get_user_id(self, scope):
+        """User id from the Flask session cookie, or None when not logged in."""
+        if not chat_app.CUSTOM_MODULES_AVAILABLE:
+            return chat_app.get_user()['sub']
+        if self._sessions is None:
+            self._sessions = self.flask_app.session_interface.get_signing_serializer(self.flask_app)
+        cookies = SimpleCookie()
+        for name, value in scope['headers']:
+            if name == b'cookie':
+                cookies.load(value.decode('latin-1'))
+        morsel = cookies.get(self.flask_app.config['SESSION_COOKIE_NAME'])
+        if morsel is None:
+            return None
+        try:
+            session = self._sessions.loads(
+                morsel.value, max_age=int(self.flask_app.permanent_session_lifetime.total_seconds())
+            )
+        except Exception:
+            return None
+        user = session.get('user')
+        return user.get('sub', 'demo-user') if user else None
+
+    def hit_rate_limit(self, user_id):
+        """Count one message against SEND_MESSAGE_LIMIT; False once it is exceeded.
+
+        The storage round trip blocks, so callers run this off the event loop.
+        Uses the same counter as the Flask route (key, then endpoint, as
+        flask_limiter builds it); like there, SEND_MESSAGE_LIMIT replaces the
+        app's default_limits for this route.
+        """
+        limiter = chat_app.limiter
+        identifiers = (f'user:{user_id}', 'main.send_message')
+        try:
+            return limiter.limiter.hit(self.rate_limit, *identifiers)
+        except (StorageError, *_as_tuple(limiter.storage.base_exceptions)) as e:
+            if limiter._fallback_limiter is None:
+                raise
+            # The switch flask_limiter flips on the same failure; its backend check flips it back.
+            logger.warning("Rate limit storage unreachable - falling back to in-memory storage: %s", e)
+            limiter._storage_dead = True
+            return limiter.limiter.hit(self.rate_limit, *identifiers)
+
+    async def send_message(self, scope, receive, send, chat_id):
+        user_id = self.get_user_id(scope)
+        if user_id is None:
+            return await send_json(send, 401, {'error': 'Authentication required'})
+        if chat_app.limiter.enabled and not await asyncio.to_thread(self.hit_rate_limit, user_id):
+            logger.warning("Rate limit exceeded")
+            return await send_json(send, 429, {'error': 'Rate limit exceeded', 'message': 'Too many requests'})
+        body = await read_body(receive)
+        try:
+            data = json.loads(body) if body else None
+        except ValueError:
+            data = None
+        error = chat_app.validate_message_payload(data)
+        if error:
+            return await send_json(send, 400, {'error': error})
+        model_name = 'gemini-2.5-flash-lite'
+        message_id = await self.db.add_message(chat_id, 'user', data['message'], user_id)
+        if not message_id:
+            return await send_json(send, 403, {'error': 'Chat not found or access denied'})
+        summary, summary_through = await self.db.get_chat_summary(chat_id, user_id)
+        messages = await self.db.get_recent_messages(chat_id, user_id, chat_app.HISTORY_MAX_MESSAGES, summary_through)
+
+        await send({'type': 'http.response.start', 'status': 200, 'headers': SSE_HEADERS})
+        async for frame in self.generate_llm_response(chat_id, user_id, messages, model_name, summary):
+            await send({'type': 'http.response.body', 'body': frame.encode(), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def generate_llm_response(self, chat_id, user_id, messages, model_name, summary=None):
+        """Async twin of app.generate_llm_response."""
+        response_cache = chat_app.response_cache
+        timer = chat_app.LLMResponseTimer(model_name)
+        try:
+            langchain_messages, cache_key = chat_app.build_llm_prompt(messages, model_name, summary)
+            cached = await self.db.run(response_cache.get, cache_key) if cache_key else None
+            if cached is not None:
+                logger.debug("Response cache hit for chat %s", chat_id)
+                full_response = cached
+                timer.finish('cache_hit')
+                yield chat_app.sse_event({'content': cached})
+            else:
+                llm = chat_app.get_llm_client(model_name)
+                full_response = ""
+                async for chunk in llm.astream(langchain_messages):
+                    content = chunk.content if hasattr(chunk, 'content') else chunk
+                    if content:
+                        timer.token()
+                        full_response += content
+                        yield chat_app.sse_event({'content': content})
+                timer.finish('ok', full_response)
+                if cache_key and full_response:
+                    await self.db.run(response_cache.set, cache_key, full_response)
+            await self.db.add_message(chat_id, 'assistant', full_response, user_id)
+            if chat_app.summary_worker.due(len(messages) + 1):
+                chat_app.summary_worker.submit(chat_id, user_id)
+            yield chat_app.sse_event({'done': True})
+        except Exception as e:
+            logger.error("LLM streaming error for %s: %s", model_name, e)
+            timer.finish('error')
+            yield chat_app.sse_event({'error': f'LLM error ({model_name}): {str(e)}'})
+
+def create_asgi_app(flask_app=None, database=None):
+    return ChatASGI(flask_app, database)
+
+application = create_asgi_app()
@@ -1,23 +1,38 @@
 from functools import wraps
-from flask import session, redirect, url_for, jsonify
-from authlib.integrations.flask_client import OAuth
+from flask import current_app, session, redirect, url_for, jsonify
+import importlib.util
 import os
+import threading
 
-oauth = OAuth()
+# authlib is imported on first use; check it is installed without loading it.
+AUTHLIB_AVAILABLE = importlib.util.find_spec('authlib') is not None
+
+_oauth_lock = threading.Lock()
 
 def init_auth(app):
-    oauth.init_app(app)
-    
-    oauth.register(
-        'auth0',
-        client_id=os.environ.get('AUTH0_CLIENT_ID'),
-        client_secret=os.environ.get('AUTH0_CLIENT_SECRET'),
-        client_kwargs={
-            'scope': 'openid profile email',
-        },
-        server_metadata_url=f'https://{os.environ.get("AUTH0_DOMAIN")}/.well-known/openid-configuration',
-    )
-    
+    # authlib is imported on the first login or callback, not at startup.
+    app.extensions.setdefault('auth0', None)
+
+def get_oauth():
+    """The app's OAuth registry, created with the auth0 client on first use."""
+    app = current_app._get_current_object()
+    oauth = app.extensions.get('auth0')
+    if oauth is None:
+        with _oauth_lock:
+            oauth = app.extensions.get('auth0')
+            if oauth is None:
+                from authlib.integrations.flask_client import OAuth
+                oauth = OAuth(app)
+                oauth.register(
+                    'auth0',
+                    client_id=os.environ.get('AUTH0_CLIENT_ID'),
+                    client_secret=os.environ.get('AUTH0_CLIENT_SECRET'),
+                    client_kwargs={
+                        'scope': 'openid profile email',
+                    },
+                    server_metadata_url=f'https://{os.environ.get("AUTH0_DOMAIN")}/.well-known/openid-configuration',
+                )
+                app.extensions['auth0'] = oauth
     return oauth
 
 def requires_auth(f):
@@ -0,0 +1,92 @@
+import logging
+import os
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+class BackgroundWorker:
+    """Runs queued jobs on daemon threads; base class of TitleWorker and SummaryWorker.
+
+    Subclasses implement ``process(job)``. ``enqueue`` never blocks: it returns
+    False when the bounded queue is full so request threads can drop the job.
+    A job given a ``key`` is not queued again while one with the same key is
+    pending or running.
+    """
+
+    thread_name = 'background-worker'
+
+    def __init__(self, workers=1, max_pending=100):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._queue = None
+        self._queued = set()
+        self._threads = []
+        self._pid = None
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so each worker process starts its own.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_pending)
+            self._queued = set()
+            self._threads = [
+                threading.Thread(target=self._run, name=f'{self.thread_name}-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            self._pid = os.getpid()
+
+    def enqueue(self, job, key=None):
+        self._ensure_started()
+        with self._lock:
+            if key is not None and key in self._queued:
+                return True
+            try:
+                self._queue.put_nowait((key, job))
+            except queue.Full:
+                return False
+            if key is not None:
+                self._queued.add(key)
+            return True
+
+    def pending(self):
+        return self._queue.qsize() if self._queue is not None and self._pid == os.getpid() else 0
+
+    def process(self, job):
+        raise NotImplementedError
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            key, job = item
+            try:
+                self.process(job)
+            except Exception as e:
+                logger.warning("%s job failed: %s", self.thread_name, e)
+            finally:
+                if key is not None:
+                    with self._lock:
+                        self._queued.discard(key)
+                self._queue.task_done()
+
+    def shutdown(self, timeout=5.0):
+        """Stop the threads after the queued jobs finish (best effort within ``timeout``)."""
+        if self._pid != os.getpid():
+            return
+        for _ in self._threads:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(timeout)
+        self._pid = None
@@ -0,0 +1,89 @@
+"""Concurrent streaming chats on the ASGI entry point.
+
+Serves asgi.application with uvicorn in-process, using the fake LLM with a
+simulated per-reply latency, then opens ``--streams`` simultaneous
+POST /api/chats/<id>/messages requests. With the reply streamed on the event
+loop, wall time stays close to a single reply's latency however many streams
+are open; a threaded WSGI worker would need one thread per stream. Each stream
+belongs to its own user, so the send-message rate limit stays enabled and
+every request pays for its storage hit without being throttled.
+
+    python benchmarks/asgi_concurrency.py --streams 1000 --latency 2
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+async def stream_chat(port, chat_id, cookie, text):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps({'message': text}).encode()
+    writer.write(
+        f'POST /api/chats/{chat_id}/messages HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n'
+        f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\nCookie: {cookie}\r\n\r\n'.encode() + body
+    )
+    await writer.drain()
+    started = time.perf_counter()
+    first_byte = None
+    response = b''
+    while chunk := await reader.read(65536):
+        if first_byte is None and b'data:' in chunk:
+            first_byte = time.perf_counter() - started
+        response += chunk
+    writer.close()
+    return b'"done": true' in response, first_byte
+
+async def run(port, chats):
+    return await asyncio.gather(*(stream_chat(port, chat_id, cookie, f'hello {i}') for i, (chat_id, cookie) in enumerate(chats)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--streams', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=1.0, help='Fake LLM delay before the first token (s)')
+    args = parser.parse_args()
+
+    # Run against a throwaway database with the offline model.
+    os.chdir(tempfile.mkdtemp())
+    os.environ.update(LLM_PROVIDER='fake', FAKE_LLM_LATENCY=str(args.latency), FAKE_LLM_TOKEN_DELAY='0.01')
+    logging.disable(logging.CRITICAL)
+    import uvicorn
+    import app as chat_app
+    from asgi import application
+
+    flask_app = application.flask_app
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    chats = []
+    for i in range(args.streams):
+        user_id = f'bench-{i}'
+        cookie = f"{flask_app.config['SESSION_COOKIE_NAME']}={serializer.dumps({'user': {'sub': user_id}})}"
+        chats.append((chat_app.db.create_chat(user_id, 'bench'), cookie))
+
+    server = uvicorn.Server(uvicorn.Config(application, port=0, log_level='error', backlog=4096))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    started = time.perf_counter()
+    results = asyncio.run(run(port, chats))
+    elapsed = time.perf_counter() - started
+    ok = sum(1 for done, _ in results if done)
+    ttfb = sorted(first for _, first in results if first is not None)
+    print(f'{args.streams} concurrent streams, {args.latency:.1f}s fake LLM latency')
+    print(f'  completed  {ok}/{args.streams}')
+    print(f'  wall time  {elapsed:.2f} s')
+    if ttfb:
+        print(f'  first byte p50 {ttfb[len(ttfb) // 2]:.2f} s, max {ttfb[-1]:.2f} s')
+    print(f'  threads    {threading.active_count()}')
+    server.should_exit = True
+
+if __name__ == '__main__':
+    main()
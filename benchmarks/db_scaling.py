@@ -0,0 +1,70 @@
+"""Show that per-chat queries stay flat as the messages table grows.
+
+Fills a scratch database in stages up to --messages rows spread across many
+chats, and after each stage times the queries the chat routes issue for one
+fixed-size chat. With the (chat_id, id) and (user_id, created_at) indexes the
+timings should not move as the table grows.
+
+    python benchmarks/db_scaling.py --messages 10000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+def fill(db, start_chat, chats, per_chat):
+    with db.connection() as conn:
+        conn.executemany(
+            'INSERT INTO chats (id, user_id, title) VALUES (?, ?, ?)',
+            ((start_chat + i, f'user-{(start_chat + i) % 1000}', 'bench') for i in range(chats))
+        )
+        conn.executemany(
+            'INSERT INTO messages (chat_id, role, content) VALUES (?, ?, ?)',
+            ((start_chat + i, 'user' if j % 2 == 0 else 'assistant', 'x' * 200)
+             for i in range(chats) for j in range(per_chat))
+        )
+
+def time_call(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=1_000_000)
+    parser.add_argument('--stages', type=int, default=5)
+    parser.add_argument('--per-chat', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'bench.db'))
+        probe_chat = db.create_chat('probe-user', 'probe')
+        for _ in range(args.per_chat):
+            db.add_message(probe_chat, 'user', 'y' * 200, 'probe-user')
+        # Inserts go to a separate chat so the probe chat keeps a fixed size.
+        insert_chat = db.create_chat('probe-user', 'inserts')
+
+        chats_per_stage = args.messages // args.stages // args.per_chat
+        next_chat = insert_chat + 1
+        print(f"{'messages':>12} {'history ms':>11} {'insert ms':>10} {'chat list ms':>13}")
+        for _ in range(args.stages):
+            fill(db, next_chat, chats_per_stage, args.per_chat)
+            next_chat += chats_per_stage
+            total = (next_chat - insert_chat - 1) * args.per_chat + args.per_chat
+            history = time_call(lambda: db.get_chat_messages(probe_chat, 'probe-user'), args.repeat)
+            insert = time_call(lambda: db.add_message(insert_chat, 'user', 'z', 'probe-user'), args.repeat)
+            listing = time_call(lambda: db.get_all_chats('probe-user'), args.repeat)
+            print(f'{total:>12,} {history:>11.3f} {insert:>10.3f} {listing:>13.3f}')
+        db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""End-to-end check that a slow PDF upload times out with 504.
+
+Uploads a synthetic PDF through the Flask upload route with one extraction
+worker and a short EXTRACTION_TIMEOUT, so the in-worker alarm fires while
+pdfminer is still parsing. Exits non-zero unless the response is 504 and the
+pool still serves the next job. Runs in a temporary directory, so no local
+database is touched.
+
+    python benchmarks/extraction_timeout.py --pages 400 --timeout 0.5
+"""
+import argparse
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=400)
+    parser.add_argument('--timeout', type=float, default=0.5)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    os.environ.update({
+        'EXTRACTION_WORKERS': '1',
+        'EXTRACTION_TIMEOUT': str(args.timeout),
+        'EXTRACTION_CACHE_DIR': '',
+        'PDF_MAX_PAGES': '0',
+        'EXTRACT_MAX_CHARS': str(10 ** 9),
+        'LLM_PROVIDER': 'fake',
+        'RATELIMIT_STORAGE_URI': 'memory://',
+        'LOG_LEVEL': 'CRITICAL',
+    })
+    logging.disable(logging.CRITICAL)
+    import app as chat_app
+    from pdf_extraction import synthetic_pdf
+
+    client = chat_app.create_app().test_client()
+    with client.session_transaction() as session:
+        session['user'] = {'sub': 'timeout-check', 'name': 'Timeout check'}
+    chat_id = client.post('/api/chats', json={'title': 'timeout check'}).get_json()['id']
+
+    started = time.perf_counter()
+    response = client.post(
+        f'/api/chats/{chat_id}/upload',
+        data={'file': (io.BytesIO(synthetic_pdf(args.pages)), 'slow.pdf'), 'message': 'summarize'},
+        content_type='multipart/form-data',
+    )
+    elapsed = time.perf_counter() - started
+    print(f'{args.pages}-page PDF, {args.timeout}s timeout: {response.status_code} after {elapsed:.2f}s '
+          f'{response.get_json()}')
+
+    recovered = chat_app.extraction_service.run(len, b'still serving') == 13
+    print(f'pool serves the next job: {recovered}')
+    chat_app.extraction_service.shutdown()
+    sys.exit(0 if response.status_code == 504 and recovered else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Per-request LLM client setup cost: fresh construction vs. the registry.
+
+Builds ChatGoogleGenerativeAI the way get_llm_client used to (a new instance
+per call) and through llm_clients.registry, and reports the mean cost of each.
+No network calls are made; a dummy API key is enough.
+
+    python benchmarks/llm_client_setup.py --iterations 50
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from llm_clients import ClientRegistry
+
+PARAMS = dict(google_api_key='benchmark-key', temperature=0.7, top_p=0.9, max_tokens=1024)
+MODEL = 'gemini-2.5-flash-lite'
+
+def mean_ms(fn, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    registry = ClientRegistry()
+    fresh = mean_ms(lambda: ChatGoogleGenerativeAI(model=MODEL, **PARAMS), args.iterations)
+    first = mean_ms(lambda: registry.get('google', MODEL, ChatGoogleGenerativeAI, **PARAMS), 1)
+    cached = mean_ms(lambda: registry.get('google', MODEL, ChatGoogleGenerativeAI, **PARAMS), args.iterations)
+    registry.shutdown()
+
+    print(f'fresh client per request : {fresh:10.4f} ms')
+    print(f'registry, first request  : {first:10.4f} ms')
+    print(f'registry, warm           : {cached:10.4f} ms')
+
+if __name__ == '__main__':
+    main()
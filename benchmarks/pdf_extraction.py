@@ -0,0 +1,84 @@
+"""PDF extraction latency: full layout pass vs. early termination.
+
+Times extraction.extract_text_from_pdf over the sample PDFs in uploads/ and over
+synthetic documents of increasing page count, once processing every page
+(the old behaviour) and once stopping at the character budget. With early
+termination the latency should stay flat as the page count grows.
+
+    python benchmarks/pdf_extraction.py --pages 10 100 300
+"""
+import argparse
+import glob
+import logging
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+logging.disable(logging.CRITICAL)
+
+from extraction import extract_text_from_pdf
+
+LINE = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor.'
+
+def synthetic_pdf(pages, lines_per_page=40):
+    """Minimal uncompressed PDF with ``pages`` pages of Helvetica text."""
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for page in range(pages):
+        body = ['BT /F1 10 Tf 40 800 Td 12 TL']
+        body += [f'({LINE} p{page} l{line}) Tj T*' for line in range(lines_per_page)]
+        body.append('ET')
+        stream = '\n'.join(body).encode('latin-1')
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        content_id = len(objects)
+        objects.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % content_id
+        )
+        kids.append(b'%d 0 R' % len(objects))
+    objects[1] = b'<< /Type /Pages /Kids [' + b' '.join(kids) + b'] /Count %d >>' % pages
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(out)
+
+def time_ms(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='*', default=[10, 50, 150])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    samples = [(os.path.basename(path), path) for path in sorted(glob.glob(os.path.join(ROOT, 'uploads', '*.pdf')))]
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            path = os.path.join(tmp, f'synthetic-{pages}.pdf')
+            with open(path, 'wb') as f:
+                f.write(synthetic_pdf(pages))
+            samples.append((f'synthetic {pages} pages', path))
+
+        print(f"{'document':<42} {'all pages ms':>13} {'early stop ms':>14}")
+        for name, path in samples:
+            full = time_ms(lambda: extract_text_from_pdf(path, max_chars=10**9, max_pages=0), args.repeat)
+            early = time_ms(lambda: extract_text_from_pdf(path), args.repeat)
+            print(f'{name:<42} {full:>13.1f} {early:>14.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Rate-limit enforcement across worker processes, per storage backend.
+
+Starts ``--workers`` processes that all hit the same "10 per minute" limit for
+one user, as gunicorn workers would, and counts how many requests each backend
+lets through. memory:// keeps a counter per process, so it admits
+10 x workers; the shared sqlite:// and redis:// backends admit exactly 10. The
+redis:// backend (limits' own storage, needs the redis package) runs against
+--redis-uri, or against a throwaway redis-server when one is on PATH; otherwise
+it is skipped.
+
+    python benchmarks/rate_limit_backends.py --workers 4 --hits 50
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+import rate_limit  # noqa: F401  (registers sqlite://)
+
+def worker(uri, hits, results):
+    limiter = FixedWindowRateLimiter(storage_from_string(uri))
+    limit = parse('10 per minute')
+    allowed = 0
+    started = time.perf_counter()
+    for _ in range(hits):
+        allowed += limiter.hit(limit, 'send_message', 'user:bench')
+    results.put((allowed, (time.perf_counter() - started) / hits))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--hits', type=int, default=50, help='Requests per worker')
+    parser.add_argument('--redis-uri', help='Redis server to test (default: in-process fakeredis)')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    uris = ['memory://', f'sqlite:///{directory}/rate_limits.db']
+    redis_uri, server = args.redis_uri, None
+    if not redis_uri and shutil.which('redis-server'):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        server = subprocess.Popen(
+            ['redis-server', '--port', str(port), '--save', '', '--dir', directory],
+            stdout=subprocess.DEVNULL,
+        )
+        redis_uri = f'redis://127.0.0.1:{port}/0'
+        deadline = time.monotonic() + 10
+        while storage_from_string(redis_uri).check() is False and time.monotonic() < deadline:
+            time.sleep(0.05)
+    if redis_uri:
+        uris.append(redis_uri)
+    else:
+        print('no --redis-uri given and no redis-server on PATH; skipping redis://')
+
+    context = multiprocessing.get_context('fork')
+    print(f'{args.workers} workers x {args.hits} requests against "10 per minute"')
+    try:
+        for uri in uris:
+            storage_from_string(uri).reset()
+            results = context.Queue()
+            processes = [context.Process(target=worker, args=(uri, args.hits, results)) for _ in range(args.workers)]
+            for process in processes:
+                process.start()
+            outcomes = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+            allowed = sum(count for count, _ in outcomes)
+            per_hit = sum(seconds for _, seconds in outcomes) / len(outcomes)
+            print(f'  {uri.split(":")[0]:<7} allowed {allowed:4d}   {per_hit * 1e6:7.1f} us/hit')
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Cold-start import time of the app, with a regression threshold.
+
+Runs ``python -X importtime -c "import app"`` in a fresh interpreter, prints
+the slowest top-level imports and fails (exit 1) when the total exceeds
+``--threshold-ms`` or when a heavy optional dependency is imported eagerly.
+The child runs from a temporary directory so no local database is migrated.
+
+    python benchmarks/startup_time.py --runs 3 --threshold-ms 1000
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only imported on first use (a Gemini call, a PDF, a login).
+DEFERRED = ('langchain_google_genai', 'langchain_core', 'pdfminer', 'pdf2image', 'authlib')
+
+_LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+def import_profile(module):
+    """Return ``[(name, cumulative_us, depth)]`` for one cold import of ``module``."""
+    env = dict(os.environ, PYTHONPATH=ROOT, LOG_LEVEL='ERROR', LLM_PROVIDER=os.environ.get('LLM_PROVIDER', 'fake'))
+    with tempfile.TemporaryDirectory() as workdir:
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=workdir, env=env, capture_output=True, text=True,
+        )
+    if result.returncode != 0:
+        sys.exit(f'import {module} failed:\n{result.stderr[-2000:]}')
+    profile = []
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            profile.append((match.group(4), int(match.group(2)), len(match.group(3)) // 2))
+    return profile
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--threshold-ms', type=float, default=1000)
+    args = parser.parse_args()
+
+    runs = [import_profile(args.module) for _ in range(args.runs)]
+    totals = sorted(dict((name, us) for name, us, _ in profile)[args.module] / 1000 for profile in runs)
+    best = min(runs, key=lambda profile: dict((name, us) for name, us, _ in profile)[args.module])
+
+    print(f'import {args.module}: best {totals[0]:.0f} ms, median {totals[len(totals) // 2]:.0f} ms over {args.runs} runs')
+    top_level = sorted(((us, name) for name, us, depth in best if depth == 1), reverse=True)
+    for us, name in top_level[:args.top]:
+        print(f'  {us / 1000:8.1f} ms  {name}')
+
+    failures = []
+    eager = sorted({name.split('.')[0] for name, _, _ in best} & set(DEFERRED))
+    if eager:
+        failures.append(f'imported eagerly: {", ".join(eager)}')
+    if totals[0] > args.threshold_ms:
+        failures.append(f'{totals[0]:.0f} ms exceeds the {args.threshold_ms:.0f} ms threshold')
+    for failure in failures:
+        print(f'FAIL: {failure}')
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Vision pipeline latency: sequential vs. concurrent page requests.
+
+Starts a local stub of an OpenAI-compatible /chat/completions endpoint that
+sleeps ``--latency`` seconds per request, then runs vision.extract_text_with_vision_model
+over a synthetic PDF with concurrency 1 (the old page-by-page loop) and with
+the configured concurrency. Concurrent runs should cost about one round trip
+regardless of page count. Without poppler installed, pages are rasterized to
+blank images so only the request fan-out is measured.
+
+    python benchmarks/vision_pipeline.py --pages 3 --latency 0.5
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+logging.disable(logging.CRITICAL)
+
+from pdf_extraction import synthetic_pdf
+from vision import VisionClient, extract_text_with_vision_model, rasterize_pdf
+
+class StubVisionHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.5
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        time.sleep(self.latency)
+        image = body['messages'][-1]['content'][0]['image_url']['url']
+        reply = json.dumps({'choices': [{'message': {'content': f'stub text ({len(image)} bytes)'}}]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, *args):
+        pass
+
+def blank_pages(file_content, last_page):
+    from PIL import Image
+    return [Image.new('RGB', (1240, 1754), 'white') for _ in range(last_page)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.5, help='Stub server delay per request (s)')
+    parser.add_argument('--concurrency', type=int, default=3)
+    args = parser.parse_args()
+
+    StubVisionHandler.latency = args.latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubVisionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = VisionClient(f'http://127.0.0.1:{server.server_port}/v1')
+
+    rasterize = rasterize_pdf if shutil.which('pdftoppm') else blank_pages
+    if rasterize is blank_pages:
+        print('pdftoppm not found; using blank page images')
+    pdf = synthetic_pdf(args.pages)
+
+    print(f'{args.pages} pages, {args.latency * 1000:.0f}ms per vision request')
+    for concurrency in (1, args.concurrency):
+        start = time.perf_counter()
+        text = extract_text_with_vision_model(client, pdf, max_pages=args.pages,
+                                              concurrency=concurrency, rasterize=rasterize)
+        elapsed = time.perf_counter() - start
+        assert text.index('--- Page 1 ---') < text.index(f'--- Page {args.pages} ---')
+        print(f'  concurrency={concurrency:<3} {elapsed * 1000:8.0f} ms')
+
+    client.close()
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import logging
+import re
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+# Approximates BPE tokenizers without loading one: words split into chunks of
+# up to four characters, plus one token per punctuation mark. Runs in the regex
+# engine, so counting a 10k-character document takes about a millisecond.
+_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+
+TRUNCATION_MARKER = "\n\n[... truncated {} tokens]"
+MIN_TRUNCATED_TOKENS = 64  # Smaller remnants of older messages are dropped instead
+
+def count_tokens(text):
+    return len(_TOKEN_RE.findall(text)) if text else 0
+
+def truncate_to_tokens(text, max_tokens):
+    """Keep the first ``max_tokens`` tokens of ``text``, noting how much was cut."""
+    if max_tokens <= 0:
+        return ""
+    match = next(islice(_TOKEN_RE.finditer(text), max_tokens, None), None)
+    if match is None:
+        return text
+    dropped = count_tokens(text[match.start():])
+    return text[:match.start()].rstrip() + TRUNCATION_MARKER.format(dropped)
+
+class ContextBuilder:
+    """Packs the newest chat turns into a fixed token budget.
+
+    Messages are taken newest first until ``max_tokens`` (including the system
+    prompt) is spent. A single message larger than ``max_message_tokens`` —
+    typically an uploaded document — is truncated rather than crowding out the
+    rest of the conversation. The newest message is always included, truncated
+    to whatever budget remains if necessary.
+
+    Messages may carry a precomputed ``token_count`` (the database stores one
+    per message); it is only computed here when missing.
+    """
+
+    def __init__(self, max_tokens=8000, max_message_tokens=3000):
+        self.max_tokens = max_tokens
+        self.max_message_tokens = max_message_tokens
+        self._prompt_tokens = {}
+
+    def prompt_tokens(self, system_prompt):
+        if system_prompt not in self._prompt_tokens:
+            self._prompt_tokens[system_prompt] = count_tokens(system_prompt)
+        return self._prompt_tokens[system_prompt]
+
+    def build(self, messages, system_prompt="", reserved_tokens=0):
+        """Return ``{'role', 'content'}`` dicts, oldest first, that fit the budget.
+
+        ``reserved_tokens`` covers other per-call prompt parts, such as a chat summary.
+        """
+        remaining = self.max_tokens - self.prompt_tokens(system_prompt) - reserved_tokens
+        packed = []
+        for msg in reversed(messages):
+            content = msg['content']
+            tokens = msg.get('token_count')
+            if tokens is None:
+                tokens = count_tokens(content)
+            limit = min(self.max_message_tokens, remaining)
+            if tokens > limit:
+                # Older turns are dropped whole once the budget is tight.
+                if packed and (tokens <= self.max_message_tokens or limit < MIN_TRUNCATED_TOKENS):
+                    break
+                content = truncate_to_tokens(content, limit)
+                tokens = limit
+            packed.append({'role': msg['role'], 'content': content})
+            remaining -= tokens
+            if remaining <= 0:
+                break
+        packed.reverse()
+        logger.debug("Context: %d/%d messages, %d tokens", len(packed), len(messages), self.max_tokens - remaining)
+        return packed
@@ -1,118 +1,522 @@
+import argparse
+import asyncio
+import functools
+import os
+import queue
 import sqlite3
+import sys
+import threading
 import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
 from datetime import datetime
 
+from context_builder import count_tokens
+
+# Pragmas applied to every pooled connection. WAL lets readers proceed while a
+# writer holds the lock; NORMAL sync is durable across app crashes in WAL mode.
+CONNECTION_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -20000),         # ~20MB page cache per connection
+    ('mmap_size', 268435456),       # 256MB memory-mapped I/O
+    ('busy_timeout', 5000),         # wait up to 5s for a lock instead of failing
+    ('temp_store', 'MEMORY'),
+    ('foreign_keys', 'ON'),         # required for ON DELETE CASCADE
+)
+
+def connect(path, row_factory=None):
+    """Open a SQLite connection with CONNECTION_PRAGMAS applied, usable from any thread."""
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+    if row_factory is not None:
+        conn.row_factory = row_factory
+    for name, value in CONNECTION_PRAGMAS:
+        conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+# Schema migrations, applied in order. PRAGMA user_version records how many have
+# run, so each one executes exactly once per database file. Append new steps to
+# the end of MIGRATIONS; never edit or reorder a step that has shipped.
+def _create_base_schema(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS chats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Databases created before per-user chats lack the user_id column.
+    cursor.execute("PRAGMA table_info(chats)")
+    columns = [column[1] for column in cursor.fetchall()]
+    if 'user_id' not in columns:
+        cursor.execute('ALTER TABLE chats ADD COLUMN user_id TEXT DEFAULT "default_user"')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (chat_id) REFERENCES chats (id)
+        )
+    ''')
+
+def _add_query_indexes(cursor):
+    # (chat_id, id) serves both the per-chat filter and the ORDER BY without a sort.
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_messages_chat_id_id ON messages(chat_id, id)')
+    # (user_id, created_at DESC) makes the sidebar listing an index range scan;
+    # it also covers every lookup the old single-column index served.
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_chats_user_created ON chats(user_id, created_at DESC)')
+    cursor.execute('DROP INDEX IF EXISTS idx_chats_user_id')
+
+def _cascade_message_deletes(cursor):
+    # SQLite cannot alter a foreign key in place, so rebuild messages. Orphaned
+    # rows (left behind by older delete paths) are unreachable and are dropped.
+    cursor.execute('''
+        CREATE TABLE messages_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (chat_id) REFERENCES chats (id) ON DELETE CASCADE
+        )
+    ''')
+    cursor.execute('''
+        INSERT INTO messages_new (id, chat_id, role, content, created_at)
+        SELECT id, chat_id, role, content, created_at FROM messages
+        WHERE chat_id IN (SELECT id FROM chats)
+    ''')
+    cursor.execute('DROP TABLE messages')
+    cursor.execute('ALTER TABLE messages_new RENAME TO messages')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_messages_chat_id_id ON messages(chat_id, id)')
+
+def _add_message_token_counts(cursor):
+    # Filled in by add_message; rows written before this step are counted the
+    # first time get_recent_messages reads them.
+    cursor.execute('ALTER TABLE messages ADD COLUMN token_count INTEGER')
+
+def _add_chat_summaries(cursor):
+    # summary_through is the id of the newest message folded into summary.
+    cursor.execute('ALTER TABLE chats ADD COLUMN summary TEXT')
+    cursor.execute('ALTER TABLE chats ADD COLUMN summary_through INTEGER NOT NULL DEFAULT 0')
+
+def _add_chat_keyset_index(cursor):
+    # Serves get_chats_page's id keyset (user_id = ? AND id < ? ORDER BY id DESC).
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_chats_user_id_id ON chats(user_id, id)')
+
+MIGRATIONS = [
+    _create_base_schema,
+    _add_query_indexes,
+    _cascade_message_deletes,
+    _add_message_token_counts,
+    _add_chat_summaries,
+    _add_chat_keyset_index,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# Columns returned to API callers; the summary is internal prompt state.
+CHAT_COLUMNS = 'id, title, created_at, user_id'
+
+class PoolTimeout(Exception):
+    """No pooled connection became free within the pool's ``timeout``."""
+
+class ConnectionPool:
+    """Thread-safe pool of persistent SQLite connections.
+
+    Connections are created lazily up to ``max_size`` and handed out LIFO so
+    hot connections (warm page cache) are reused first. The pool is reset
+    after a fork so pre-forked workers never share a file handle.
+    """
+
+    def __init__(self, factory, max_size=8, timeout=30.0):
+        self.factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._pid = os.getpid()
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # Inherited connections belong to the parent; drop them without closing.
+                    self._reset()
+
+    def acquire(self):
+        self._check_pid()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.max_size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self.factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolTimeout("Timed out waiting for a database connection")
+
+    def release(self, conn):
+        if self._pid != os.getpid():
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Borrow a connection; commits on success, rolls back on error."""
+        conn = self.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(conn)
+
 class Database:
-    def __init__(self, db_name='chat_history.db'):
+    def __init__(self, db_name='chat_history.db', pool_size=None, auto_migrate=None):
         self.db_name = db_name
+        if pool_size is None:
+            pool_size = int(os.environ.get('DB_POOL_SIZE', 8))
+        if auto_migrate is None:
+            auto_migrate = os.environ.get('DB_AUTO_MIGRATE', 'true').lower() == 'true'
+        self.auto_migrate = auto_migrate
+        self.pool = ConnectionPool(self.get_connection, max_size=pool_size)
         self.init_db()
     
+    def warm_up(self, connections=None):
+        """Open ``connections`` pooled connections (default: the whole pool) with the schema loaded."""
+        count = min(connections or self.pool.max_size, self.pool.max_size)
+        conns = [self.pool.acquire() for _ in range(count)]
+        try:
+            for conn in conns:
+                conn.execute('SELECT 1 FROM chats LIMIT 1').fetchall()
+        finally:
+            for conn in conns:
+                self.pool.release(conn)
+        return count
+
     def get_connection(self):
-        conn = sqlite3.connect(self.db_name)
-        conn.row_factory = sqlite3.Row
-        return conn
+        return connect(self.db_name, row_factory=sqlite3.Row)
+    
+    def connection(self):
+        """Borrow a pooled connection; commits on success, rolls back on error."""
+        return self.pool.transaction()
+    
+    def close(self):
+        self.pool.close_all()
     
     def init_db(self):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS chats (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        cursor.execute("PRAGMA table_info(chats)")
-        columns = [column[1] for column in cursor.fetchall()]
-        if 'user_id' not in columns:
-            cursor.execute('ALTER TABLE chats ADD COLUMN user_id TEXT DEFAULT "default_user"')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                chat_id INTEGER NOT NULL,
-                role TEXT NOT NULL,
-                content TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (chat_id) REFERENCES chats (id)
+        """Check the schema version, migrating only when it is behind.
+
+        The check is a plain read, so workers starting together against an
+        up-to-date file never queue on the write lock.
+        """
+        if self.get_schema_version() >= SCHEMA_VERSION:
+            return 0
+        if not self.auto_migrate:
+            raise Exception(
+                f"Database schema of {self.db_name} is out of date; run `python database.py migrate`"
             )
-        ''')
-        
+        return self.migrate()
+    
+    def get_schema_version(self):
+        with self.connection() as conn:
+            return conn.execute('PRAGMA user_version').fetchone()[0]
+    
+    def migrate(self):
+        """Apply pending migrations; returns the number of steps run."""
+        conn = self.pool.acquire()
         try:
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_chats_user_id ON chats(user_id)')
-        except sqlite3.OperationalError:
-            pass
-        
-        conn.commit()
-        conn.close()
+            # BEGIN IMMEDIATE takes the write lock up front so concurrent
+            # processes serialize here and re-read the version once they get it.
+            conn.execute('BEGIN IMMEDIATE')
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            cursor = conn.cursor()
+            for step in MIGRATIONS[version:]:
+                step(cursor)
+            if version < SCHEMA_VERSION:
+                cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.commit()
+            return max(SCHEMA_VERSION - version, 0)
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.release(conn)
     
     def create_chat(self, user_id, title="New Chat"):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('INSERT INTO chats (user_id, title) VALUES (?, ?)', (user_id, title))
-        chat_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return chat_id
+        with self.connection() as conn:
+            cursor = conn.execute('INSERT INTO chats (user_id, title) VALUES (?, ?)', (user_id, title))
+            return cursor.lastrowid
     
     def get_all_chats(self, user_id):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            'SELECT * FROM chats WHERE user_id = ? ORDER BY created_at DESC',
-            (user_id,)
-        )
-        chats = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return chats
+        with self.connection() as conn:
+            cursor = conn.execute(
+                f'SELECT {CHAT_COLUMNS} FROM chats WHERE user_id = ? ORDER BY created_at DESC',
+                (user_id,)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_chats_page(self, user_id, before=None, limit=50):
+        """Keyset page of a user's chats, newest first.
+
+        ``before`` is the id of the last chat on the previous page. Returns
+        ``(chats, next_cursor)``; ``next_cursor`` is None on the last page.
+        Ids are assigned in insertion order, so the cursor stays valid even if
+        that chat has since been deleted.
+        """
+        query = f'SELECT {CHAT_COLUMNS} FROM chats WHERE user_id = ?'
+        params = [user_id]
+        if before is not None:
+            query += ' AND id < ?'
+            params.append(before)
+        query += ' ORDER BY id DESC LIMIT ?'
+        params.append(limit + 1)
+        with self.connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        chats = [dict(row) for row in rows[:limit]]
+        next_cursor = chats[-1]['id'] if len(rows) > limit else None
+        return chats, next_cursor
+    
+    def get_chat(self, chat_id, user_id):
+        with self.connection() as conn:
+            row = conn.execute(
+                f'SELECT {CHAT_COLUMNS} FROM chats WHERE id = ? AND user_id = ?', (chat_id, user_id)
+            ).fetchone()
+        return dict(row) if row else None
+    
+    def update_chat_title(self, chat_id, user_id, title):
+        with self.connection() as conn:
+            cursor = conn.execute(
+                'UPDATE chats SET title = ? WHERE id = ? AND user_id = ?', (title, chat_id, user_id)
+            )
+            return cursor.rowcount > 0
     
     def get_chat_owner(self, chat_id):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT user_id FROM chats WHERE id = ?', (chat_id,))
-        result = cursor.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            result = conn.execute('SELECT user_id FROM chats WHERE id = ?', (chat_id,)).fetchone()
         return result['user_id'] if result else None
     
     def get_chat_messages(self, chat_id, user_id):
-        if self.get_chat_owner(chat_id) != user_id:
-            return []
+        # Ownership is enforced by the join, so a foreign chat simply yields no rows.
+        with self.connection() as conn:
+            cursor = conn.execute(
+                '''
+                SELECT m.* FROM messages m
+                JOIN chats c ON c.id = m.chat_id
+                WHERE m.chat_id = ? AND c.user_id = ?
+                ORDER BY m.id ASC
+                ''',
+                (chat_id, user_id)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_messages_page(self, chat_id, user_id, before=None, limit=50):
+        """Keyset page of a chat's messages, returned oldest first.
+
+        Pages walk backwards from the newest message; pass ``next_cursor`` as
+        ``before`` to fetch the next-older page. Returns ``(messages, next_cursor)``.
+        """
+        query = '''
+            SELECT m.* FROM messages m
+            JOIN chats c ON c.id = m.chat_id
+            WHERE m.chat_id = ? AND c.user_id = ?
+        '''
+        params = [chat_id, user_id]
+        if before is not None:
+            query += ' AND m.id < ?'
+            params.append(before)
+        query += ' ORDER BY m.id DESC LIMIT ?'
+        params.append(limit + 1)
+        with self.connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        messages = [dict(row) for row in rows[:limit]]
+        next_cursor = messages[-1]['id'] if len(rows) > limit else None
+        messages.reverse()
+        return messages, next_cursor
+    
+    def get_recent_messages(self, chat_id, user_id, limit=50, after_id=0):
+        """Return the newest ``limit`` messages after ``after_id``, oldest first, with token counts.
+
+        Walks the (chat_id, id) index backwards so cost depends on the window,
+        not the chat length. Token budgeting is left to ContextBuilder.
+        """
+        with self.connection() as conn:
+            cursor = conn.execute(
+                '''
+                SELECT m.id, m.role, m.content, m.token_count FROM messages m
+                JOIN chats c ON c.id = m.chat_id
+                WHERE m.chat_id = ? AND c.user_id = ? AND m.id > ?
+                ORDER BY m.id DESC
+                LIMIT ?
+                ''',
+                (chat_id, user_id, after_id, limit)
+            )
+            messages = self._with_token_counts(conn, cursor.fetchall())
         
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            'SELECT * FROM messages WHERE chat_id = ? ORDER BY created_at ASC',
-            (chat_id,)
-        )
-        messages = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        messages.reverse()
         return messages
     
+    def get_messages_after(self, chat_id, user_id, after_id=0, limit=50):
+        """Return the oldest ``limit`` messages after ``after_id``, oldest first, with token counts."""
+        with self.connection() as conn:
+            cursor = conn.execute(
+                '''
+                SELECT m.id, m.role, m.content, m.token_count FROM messages m
+                JOIN chats c ON c.id = m.chat_id
+                WHERE m.chat_id = ? AND c.user_id = ? AND m.id > ?
+                ORDER BY m.id ASC
+                LIMIT ?
+                ''',
+                (chat_id, user_id, after_id, limit)
+            )
+            return self._with_token_counts(conn, cursor.fetchall())
+    
+    @staticmethod
+    def _with_token_counts(conn, rows):
+        messages = [dict(row) for row in rows]
+        # Backfill counts for messages stored before the column existed.
+        missing = [msg for msg in messages if msg['token_count'] is None]
+        for msg in missing:
+            msg['token_count'] = count_tokens(msg['content'])
+        if missing:
+            conn.executemany(
+                'UPDATE messages SET token_count = ? WHERE id = ?',
+                [(msg['token_count'], msg['id']) for msg in missing]
+            )
+        return messages
+    
+    def get_chat_summary(self, chat_id, user_id):
+        """Return ``(summary, summary_through)``; ``(None, 0)`` before the first summary."""
+        with self.connection() as conn:
+            row = conn.execute(
+                'SELECT summary, summary_through FROM chats WHERE id = ? AND user_id = ?',
+                (chat_id, user_id)
+            ).fetchone()
+        return (row['summary'], row['summary_through']) if row else (None, 0)
+    
+    def update_chat_summary(self, chat_id, user_id, summary, through_id):
+        # Never move the summary backwards if two updates race.
+        with self.connection() as conn:
+            cursor = conn.execute(
+                '''
+                UPDATE chats SET summary = ?, summary_through = ?
+                WHERE id = ? AND user_id = ? AND summary_through < ?
+                ''',
+                (summary, through_id, chat_id, user_id, through_id)
+            )
+            return cursor.rowcount > 0
+    
     def add_message(self, chat_id, role, content, user_id):
-        if self.get_chat_owner(chat_id) != user_id:
-            return None
-        
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            'INSERT INTO messages (chat_id, role, content) VALUES (?, ?, ?)',
-            (chat_id, role, content)
-        )
-        message_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return message_id
+        # INSERT ... SELECT inserts nothing unless the chat belongs to user_id.
+        with self.connection() as conn:
+            cursor = conn.execute(
+                '''
+                INSERT INTO messages (chat_id, role, content, token_count)
+                SELECT id, ?, ?, ? FROM chats WHERE id = ? AND user_id = ?
+                ''',
+                (role, content, count_tokens(content), chat_id, user_id)
+            )
+            return cursor.lastrowid if cursor.rowcount else None
     
     def delete_chat(self, chat_id, user_id):
-        if self.get_chat_owner(chat_id) != user_id:
-            return False
-        
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM messages WHERE chat_id = ?', (chat_id,))
-        cursor.execute('DELETE FROM chats WHERE id = ?', (chat_id,))
-        conn.commit()
-        conn.close()
-        return True
+        # Messages go with the chat via ON DELETE CASCADE.
+        with self.connection() as conn:
+            cursor = conn.execute('DELETE FROM chats WHERE id = ? AND user_id = ?', (chat_id, user_id))
+            return cursor.rowcount > 0
+
+class AsyncDatabase:
+    """Awaitable facade over a Database (or DemoDB) for the ASGI server.
+
+    Every method of the wrapped object is available as a coroutine. Calls run
+    on a thread pool no larger than the connection pool, so the event loop is
+    never blocked on SQLite and the pooled connections, pragmas and migrations
+    are shared with the synchronous app. The queries are short index lookups,
+    so a few threads serve thousands of streams that spend their time waiting
+    on the LLM.
+    """
+
+    def __init__(self, db, max_workers=None):
+        self.db = db
+        if max_workers is None:
+            pool = getattr(db, 'pool', None)
+            max_workers = pool.max_size if pool else 1
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='db')
+
+    async def run(self, fn, *args):
+        """Run any blocking ``fn(*args)`` on the database threads."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+
+    def __getattr__(self, name):
+        method = getattr(self.db, name)
+        if not callable(method):
+            return method
+
+        @functools.wraps(method)
+        async def call(*args):
+            return await self.run(method, *args)
+        return call
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the chat database schema.")
+    parser.add_argument('command', choices=['migrate', 'status'],
+                        help="migrate: apply pending migrations; status: exit 1 if any are pending")
+    parser.add_argument('--db', default='chat_history.db', help="database file (default: chat_history.db)")
+    args = parser.parse_args(argv)
+
+    version = 0
+    if os.path.exists(args.db):
+        with closing(sqlite3.connect(args.db)) as conn:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if args.command == 'status':
+        print(f"{args.db}: schema version {version}, current {SCHEMA_VERSION}")
+        return 0 if version >= SCHEMA_VERSION else 1
+    if version >= SCHEMA_VERSION:
+        print(f"{args.db}: already at schema version {version}")
+        return 0
+    Database(args.db, pool_size=1, auto_migrate=True).close()
+    print(f"{args.db}: migrated from schema version {version} to {SCHEMA_VERSION}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
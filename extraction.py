@@ -0,0 +1,119 @@
+"""Document text extraction.
+
+Kept free of Flask and LLM imports so extraction worker processes can import
+it cheaply; app.py re-exports these names for existing callers.
+"""
+import importlib.util
+import logging
+import os
+import time
+from contextlib import nullcontext
+from io import StringIO, BytesIO, TextIOWrapper
+
+logger = logging.getLogger(__name__)
+
+# pdfminer is imported on first use; finding the package is enough to report it available.
+PDF_MINER_AVAILABLE = importlib.util.find_spec('pdfminer') is not None
+if not PDF_MINER_AVAILABLE:
+    logger.warning("pdfminer.six not available. PDF processing disabled.")
+
+# What the functions below import on first use; the startup warm-up loads them early.
+PDF_MINER_MODULES = (
+    'pdfminer.pdfinterp', 'pdfminer.converter', 'pdfminer.layout', 'pdfminer.pdfpage',
+    'pdfminer.pdfparser', 'pdfminer.pdfdocument', 'pdfminer.pdftypes',
+)
+
+EXTRACT_MAX_CHARS = int(os.environ.get('EXTRACT_MAX_CHARS', 10000))  # Text kept per document
+PDF_MAX_PAGES = int(os.environ.get('PDF_MAX_PAGES', 50))  # Hard page cap; 0 disables
+
+def as_binary_stream(source):
+    """Wrap bytes/memoryview in BytesIO; rewind file objects; leave paths alone."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return BytesIO(source)
+    if hasattr(source, 'read'):
+        source.seek(0)
+    return source
+
+def extract_text_from_pdf(source, max_chars=None, max_pages=None):
+    """Extract text page by page, stopping once ``max_chars`` have been collected.
+
+    ``source`` may be a path, bytes/memoryview or a seekable binary file object;
+    in-memory uploads are parsed directly without touching disk. Layout analysis
+    is the expensive part, so pages past the character budget (or past
+    ``max_pages``; 0 means no limit) are never processed.
+    """
+    if not PDF_MINER_AVAILABLE:
+        raise Exception("PDF processing requires pdfminer.six")
+    from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfpage import PDFPage
+    max_chars = EXTRACT_MAX_CHARS if max_chars is None else max_chars
+    max_pages = PDF_MAX_PAGES if max_pages is None else max_pages
+    try:
+        rsrcmgr = PDFResourceManager()
+        retstr = StringIO()
+        laparams = LAParams()
+        device = TextConverter(rsrcmgr, retstr, laparams=laparams)
+        page_times = []
+        source = as_binary_stream(source)
+        with (open(source, 'rb') if isinstance(source, (str, os.PathLike)) else nullcontext(source)) as fp:
+            interpreter = PDFPageInterpreter(rsrcmgr, device)
+            for page in PDFPage.get_pages(fp, maxpages=max_pages):
+                started = time.perf_counter()
+                interpreter.process_page(page)
+                page_times.append(time.perf_counter() - started)
+                # tell() is the number of characters written so far; only pay for
+                # getvalue() once the raw count could already satisfy the budget.
+                if retstr.tell() >= max_chars and len(retstr.getvalue().lstrip()) >= max_chars:
+                    break
+            text = retstr.getvalue()
+        device.close()
+        retstr.close()
+        if page_times:
+            logger.debug(
+                "PDF extracted %d page(s) in %.1fms (slowest %.1fms)",
+                len(page_times), sum(page_times) * 1000, max(page_times) * 1000
+            )
+        return text.strip()[:max_chars]
+    except MemoryError:
+        raise  # the extraction service reports it as ExtractionTooLarge
+    except Exception as e:
+        logger.error("PDF processing error: %s", e)
+        raise Exception(f"Failed to process PDF: {str(e)}")
+
+def count_pdf_pages(source):
+    """Page count from the document catalog, without walking or parsing any page."""
+    if not PDF_MINER_AVAILABLE:
+        raise Exception("PDF processing requires pdfminer.six")
+    from pdfminer.pdfparser import PDFParser
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdftypes import resolve1
+    source = as_binary_stream(source)
+    with (open(source, 'rb') if isinstance(source, (str, os.PathLike)) else nullcontext(source)) as fp:
+        document = PDFDocument(PDFParser(fp))
+        pages = resolve1(document.catalog['Pages'])
+        return int(resolve1(pages['Count']))
+
+def extract_text_from_txt(file_content):
+    """Decode at most EXTRACT_MAX_CHARS characters from a path, bytes or binary file.
+
+    Only the prefix that is kept is read and decoded, however large the file is.
+    """
+    try:
+        encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
+        source = as_binary_stream(file_content)
+        with (open(source, 'rb') if isinstance(source, (str, os.PathLike)) else nullcontext(source)) as fp:
+            for encoding in encodings:
+                fp.seek(0)
+                reader = TextIOWrapper(fp, encoding=encoding, newline='')
+                try:
+                    return reader.read(EXTRACT_MAX_CHARS)
+                except UnicodeDecodeError:
+                    continue
+                finally:
+                    reader.detach()  # leave the underlying file open for the next attempt
+        raise Exception("Could not decode text file")
+    except Exception as e:
+        logger.error("Text file error: %s", e)
+        raise Exception(f"Failed to process text file: {str(e)}")
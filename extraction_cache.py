@@ -0,0 +1,117 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+def make_cache_key(digest, extension, extractor_version):
+    """Key for a file whose SHA-256 hex digest is ``digest``."""
+    return f"{digest}-{extension}-v{extractor_version}"
+
+class ExtractionCache:
+    """On-disk cache of extracted document text, addressed by file content.
+
+    Each entry is one UTF-8 file named by its key. Reads bump the file's mtime,
+    and once the directory exceeds ``max_bytes`` the least recently used
+    entries are removed until it is back under 90% of the budget. Writes go
+    through a temp file and os.replace so concurrent workers never see a
+    partial entry.
+
+    The directory is shared by every worker process, so the running size is
+    re-read from disk every ``RESCAN_EVERY`` writes to pick up the others'
+    entries; between rescans it may overshoot by what the other workers wrote.
+    """
+
+    RESCAN_EVERY = 32
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._bytes = self._disk_usage()
+        self._writes = 0
+
+    def _disk_usage(self):
+        total = 0
+        for entry in self._entries():
+            try:
+                total += entry.stat().st_size
+            except OSError:
+                continue  # removed by another worker
+        return total
+
+    @staticmethod
+    def digest(content):
+        return hashlib.sha256(content).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.txt')
+
+    def _entries(self):
+        return [entry for entry in os.scandir(self.directory) if entry.is_file() and entry.name.endswith('.txt')]
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning("Extraction cache read failed for %s: %s", key, e)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return text
+
+    def set(self, key, text):
+        data = text.encode('utf-8')
+        path = self._path(key)
+        try:
+            replaced = os.path.getsize(path)  # another worker cached the same file
+        except OSError:
+            replaced = 0
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Extraction cache write failed for %s: %s", key, e)
+            return
+        with self._lock:
+            self._writes += 1
+            if self._writes % self.RESCAN_EVERY == 0:
+                self._bytes = self._disk_usage()
+            else:
+                self._bytes += len(data) - replaced
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue  # removed by another worker
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # another worker evicted it first
+            except OSError:
+                continue
+            total -= size
+        self._bytes = total
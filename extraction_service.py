@@ -0,0 +1,187 @@
+import atexit
+import importlib
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+class ExtractionSaturated(Exception):
+    """Every worker is busy and the pending queue is full."""
+
+class ExtractionTimeout(Exception):
+    """A job ran past its time budget and was aborted."""
+
+class ExtractionTooLarge(Exception):
+    """A job ran out of memory under the worker's memory limit."""
+
+def _init_worker(memory_limit_bytes):
+    if resource is not None and memory_limit_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+
+_alarm_fired = False
+
+def _raise_timeout(signum, frame):
+    global _alarm_fired
+    _alarm_fired = True
+    raise ExtractionTimeout("Document extraction timed out")
+
+def _import_modules(modules):
+    for name in modules:
+        importlib.import_module(name)
+    return os.getpid()
+
+def _run_job(fn, args, timeout):
+    # pdfminer is pure Python, so an interval timer interrupts it between
+    # bytecodes and the worker survives to take the next job.
+    global _alarm_fired
+    _alarm_fired = False
+    if timeout and hasattr(signal, 'setitimer'):
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return fn(*args)
+    except Exception:
+        # Extractors wrap errors in their own; report the timeout whatever it became.
+        if _alarm_fired:
+            raise ExtractionTimeout("Document extraction timed out") from None
+        raise
+    finally:
+        if timeout and hasattr(signal, 'setitimer'):
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+class ExtractionService:
+    """Runs CPU-bound extraction jobs in a recycled process pool.
+
+    Keeps pdfminer off the request threads (and their GIL). ``workers`` = 0
+    runs jobs inline, which is handy for local debugging. Admission is bounded
+    by ``workers + max_queue`` in-flight jobs; beyond that ``run`` raises
+    ExtractionSaturated rather than queueing without limit.
+    """
+
+    def __init__(self, workers=2, max_queue=8, timeout=30.0, memory_limit_mb=1024, max_tasks_per_child=50):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.max_tasks_per_child = max_tasks_per_child
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._preload = ()
+        self._slots = threading.BoundedSemaphore(workers + max_queue) if workers else None
+
+    def _get_executor(self):
+        # Created lazily so pre-forked server workers each build their own pool.
+        if self._executor is not None and self._pid == os.getpid():
+            return self._executor
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # max_tasks_per_child cannot be combined with the fork start method.
+                method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                context = multiprocessing.get_context(method)
+                if method == 'forkserver' and self._preload:
+                    # Imported once in the fork server, so recycled workers start with them loaded.
+                    context.set_forkserver_preload(list(self._preload))
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(self.memory_limit_mb * 1024 * 1024,),
+                    max_tasks_per_child=self.max_tasks_per_child,
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def run(self, fn, *args):
+        """Run ``fn(*args)`` in a worker and return its result."""
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise ExtractionSaturated("Document extraction is at capacity, please retry shortly")
+        try:
+            executor = self._get_executor()
+            future = executor.submit(_run_job, fn, args, self.timeout)
+            try:
+                return self._wait(future)
+            except FutureTimeoutError:
+                logger.error("Extraction worker unresponsive; restarting the pool")
+                self._restart(executor)
+                raise ExtractionTimeout("Document extraction timed out")
+            except MemoryError:
+                raise ExtractionTooLarge("Document is too large to process")
+            except BrokenProcessPool:
+                # A worker died mid-job (e.g. killed at the memory limit).
+                self._restart(executor)
+                raise Exception("Document extraction failed")
+        finally:
+            self._slots.release()
+
+    def _wait(self, future):
+        """Result of ``future``; FutureTimeoutError only if it is stuck once started.
+
+        Time spent queued behind other jobs does not count. A future is marked
+        running when it enters the workers' call queue, at most one job ahead of
+        a free worker, so the deadline allows one timeout for that job, one for
+        this job's own in-worker timer, and a few seconds of slack.
+        """
+        started = None
+        while True:
+            try:
+                return future.result(timeout=1.0)
+            except FutureTimeoutError:
+                pass
+            if started is None:
+                if future.running():
+                    started = time.monotonic()
+            elif time.monotonic() - started > self.timeout * 2 + 5:
+                raise FutureTimeoutError()
+
+    def warm_up(self, modules=()):
+        """Start the workers now with ``modules`` imported, instead of on the first upload."""
+        if not self.workers:
+            _import_modules(modules)
+            return 0
+        self._preload = tuple(modules)
+        executor = self._get_executor()
+        futures = [executor.submit(_import_modules, self._preload) for _ in range(self.workers)]
+        return len({future.result(timeout=self.timeout) for future in futures})
+
+    def _restart(self, executor):
+        # Only the pool the failed job ran on; another failure may have replaced it already.
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        if executor is not None:
+            # A job stuck in C code ignores SIGALRM; terminate the workers outright.
+            for process in list(getattr(executor, '_processes', {}).values()):
+                process.terminate()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+def create_extraction_service():
+    service = ExtractionService(
+        workers=int(os.environ.get('EXTRACTION_WORKERS', 2)),
+        max_queue=int(os.environ.get('EXTRACTION_QUEUE_SIZE', 8)),
+        timeout=float(os.environ.get('EXTRACTION_TIMEOUT', 30)),
+        memory_limit_mb=int(os.environ.get('EXTRACTION_MEMORY_LIMIT_MB', 1024)),
+        max_tasks_per_child=int(os.environ.get('EXTRACTION_MAX_TASKS_PER_CHILD', 50)),
+    )
+    atexit.register(service.shutdown)
+    return service
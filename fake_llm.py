@@ -0,0 +1,51 @@
+import asyncio
+import re
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+class FakeChatModel(BaseChatModel):
+    """Offline stand-in for the Gemini chat model.
+
+    Selected with LLM_PROVIDER=fake. Replies deterministically by echoing the
+    last message, streams word by word, and can simulate network latency, so
+    the app and its background workers can be exercised without an API key.
+    """
+
+    model: str = 'fake'
+    latency: float = 0.0  # seconds before the first token
+    token_delay: float = 0.0  # seconds between streamed tokens
+
+    @property
+    def _llm_type(self):
+        return 'fake'
+
+    def _reply(self, messages):
+        last = messages[-1].content if messages else ''
+        return f"Echo: {last[:200]}"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        message = AIMessage(content=self._reply(messages))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        for token in re.findall(r'\S+\s*', self._reply(messages)):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        message = AIMessage(content=self._reply(messages))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        for token in re.findall(r'\S+\s*', self._reply(messages)):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
@@ -0,0 +1,94 @@
+"""Gunicorn settings for production serving.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every setting can be overridden from the environment. The defaults target the
+typical load for this app: requests that spend most of their time waiting on
+the LLM (streamed replies lasting seconds to minutes) plus occasional
+CPU-heavy uploads, which run in the separate extraction process pool.
+"""
+import multiprocessing
+import os
+import tempfile
+
+import metrics
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+
+# gthread: each open SSE stream holds one thread, not one process, so a worker
+# serves `threads` concurrent chats. Use `sync` only behind a buffering proxy
+# with short requests. For thousands of concurrent streams, serve asgi.py
+# instead (uvicorn, or GUNICORN_WORKER_CLASS=uvicorn_worker.UvicornWorker with
+# asgi:application).
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+
+# Processes. Request handling is I/O-bound, so a few processes are enough; add
+# more only when CPU-bound work (prompt building, JSON) saturates a core. Each
+# worker has its own SQLite pool, LLM clients and background threads.
+workers = _env_int('GUNICORN_WORKERS', min(multiprocessing.cpu_count(), 4))
+
+# Concurrent requests per worker. Size for the expected number of simultaneous
+# streaming chats divided by `workers`. Keep DB_POOL_SIZE at or below this;
+# queries are short, so a pool smaller than the thread count is fine.
+threads = _env_int('GUNICORN_THREADS', 16)
+
+# Import the app once in the master and fork workers from it. This shares the
+# heavy LangChain imports between workers via copy-on-write and runs schema
+# migrations once. It also gives all workers the same random SECRET_KEY when
+# none is configured. Pooled connections, LLM clients and worker threads are
+# recreated in each child after fork.
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Recycle each worker after this many requests (plus up to `max_requests_jitter`
+# so they do not all restart together) to bound slow memory growth from PDF
+# parsing and LLM client buffers. 0 disables recycling.
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+# Seconds a worker may go silent before the master kills it. gthread workers
+# heartbeat from their main thread, so long streams do not trip this. With the
+# sync worker it bounds a whole request, including the LLM stream, so raise it
+# above the longest expected reply.
+timeout = _env_int('GUNICORN_TIMEOUT', 120)
+
+# On reload or SIGTERM, in-flight streams get this long to finish before
+# workers are killed. Match it to the longest reply you want to survive a deploy.
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 60)
+
+# Idle seconds to hold a client connection open between requests. Behind a
+# load balancer, set it above the balancer's idle timeout (e.g. 65 for a 60s
+# ALB) so the balancer never reuses a connection gunicorn has just closed.
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+# Each worker writes its metrics to a file here and /metrics sums them, so a
+# scrape covers every worker rather than whichever one answered. Defaults to a
+# fresh directory per start; snapshots left by a previous run are cleared.
+if not os.environ.get('METRICS_DIR'):
+    os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='chat-metrics-')
+metrics_dir = os.environ['METRICS_DIR']
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+# Opt-in (WARMUP=true): each worker builds its LLM clients, pooled DB
+# connections and extraction processes before accepting requests, so the first
+# request after a scale-out is as fast as steady state. With preload_app the
+# heavy imports happen once in the master and are shared copy-on-write.
+warmup = os.environ.get('WARMUP', 'false').lower() == 'true'
+
+def on_starting(server):
+    metrics.clear_snapshots(metrics_dir)
+
+def when_ready(server):
+    if warmup and preload_app:
+        import app
+        app.preload_modules()
+
+def post_fork(server, worker):
+    if warmup:
+        import app
+        import wsgi
+        app.warm_up(wsgi.app)
@@ -0,0 +1,68 @@
+import atexit
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+class ClientRegistry:
+    """Process-wide cache of LLM chat clients.
+
+    Clients are keyed by (provider, model, params) and built lazily on first
+    use, so every request after the first reuses the same HTTP connection pool
+    and TLS sessions. Chat model objects are safe to share across threads.
+    """
+
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(provider, model, params):
+        return (provider, model, tuple(sorted(params.items())))
+
+    def get(self, provider, model, factory, **params):
+        key = self.make_key(provider, model, params)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            # Another thread may have built it while we waited for the lock.
+            client = self._clients.get(key)
+            if client is None:
+                logger.debug("Creating %s client for %s", provider, model)
+                client = factory(model=model, **params)
+                self._clients[key] = client
+            return client
+
+    def __len__(self):
+        return len(self._clients)
+
+    def shutdown(self):
+        """Close every cached client's transport and empty the registry."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            _close_client(client)
+
+    def _forget(self):
+        # After fork the child must not reuse the parent's sockets; drop them unclosed.
+        self._clients = {}
+        self._lock = threading.Lock()
+
+def _close_client(client):
+    # LangChain wrappers hold the SDK client on .client; close whichever exposes close().
+    for target in (client, getattr(client, 'client', None)):
+        close = getattr(target, 'close', None)
+        if callable(close):
+            try:
+                close()
+            except Exception as e:
+                logger.warning("Failed to close LLM client: %s", e)
+            return
+
+registry = ClientRegistry()
+atexit.register(registry.shutdown)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=registry._forget)
@@ -0,0 +1,122 @@
+"""Logging setup: JSON or text output, written off the request thread.
+
+Request threads only filter and enqueue records; a QueueListener thread does
+the formatting and the stderr writes. Configured from the environment:
+
+    LOG_LEVEL=INFO                       root level
+    LOG_LEVELS=app=DEBUG,pdfminer=ERROR  per-logger overrides
+    LOG_FORMAT=json                      json or text
+    LOG_DEBUG_SAMPLE_RATE=0.1            fraction of DEBUG records kept
+    LOG_QUEUE_SIZE=10000                 records buffered before new ones are dropped
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+# Attributes every LogRecord has; anything else came in through ``extra=``.
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; ``extra=`` fields are included as keys."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class DebugSampler(logging.Filter):
+    """Keeps a random ``rate`` fraction of DEBUG records; higher levels always pass."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: when the queue is full the record is dropped and counted."""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Interpolate args now (they may be mutated once we return) but leave the
+        # formatting into text or JSON to the listener thread.
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+_traceback_formatter = logging.Formatter()
+_handler = None
+_listener = None
+
+def _parse_levels(spec):
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, level = item.partition('=')
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+def _start_listener():
+    """(Re)start the writer thread on a fresh queue; threads do not survive fork."""
+    global _listener
+    _handler.queue = queue.Queue(maxsize=int(os.environ.get('LOG_QUEUE_SIZE', 10000)))
+    output = logging.StreamHandler(sys.stderr)
+    if os.environ.get('LOG_FORMAT', 'text').lower() == 'json':
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s'))
+    _listener = logging.handlers.QueueListener(_handler.queue, output, respect_handler_level=False)
+    _listener.start()
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+def configure_logging():
+    """Install the queue handler on the root logger. Safe to call more than once."""
+    global _handler
+    if _handler is not None:
+        return
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+    for name, level in _parse_levels(os.environ.get('LOG_LEVELS', '')).items():
+        logging.getLogger(name).setLevel(level)
+
+    _handler = DroppingQueueHandler(queue.Queue())
+    sample_rate = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', 1.0))
+    if sample_rate < 1.0:
+        _handler.addFilter(DebugSampler(sample_rate))
+    root.addHandler(_handler)
+    _start_listener()
+    atexit.register(_stop_listener)
+    os.register_at_fork(after_in_child=_start_listener)
@@ -0,0 +1,255 @@
+"""Minimal in-process metrics with Prometheus text exposition.
+
+Counters and histograms are plain Python objects guarded by one lock per
+metric, so recording a sample costs about a microsecond and can stay on in
+production.
+
+With several worker processes, ``configure(directory)`` makes the values
+server-wide: each process writes a snapshot of its own values to a file in
+``directory`` every ``flush_interval`` seconds (and at exit), and ``render()``
+sums every file there, so whichever worker serves /metrics reports them all.
+Files of exited workers are kept, so counters stay monotonic when gunicorn
+recycles workers.
+"""
+import atexit
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans sub-millisecond SQLite reads up to long LLM streams.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_registry = []
+
+# Cross-process aggregation, off until configure() is called.
+_directory = None
+_flush_interval = 5.0
+_flush_lock = threading.Lock()
+_flusher_pid = None  # process whose flusher thread is running
+_snapshot_path = None
+_changes = 0  # bumped on every sample, so idle processes skip rewriting their file
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        _recorded()
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._values.items())
+
+    def _reset(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def merge(total, value):
+        return total + value
+
+    def collect(self, series):
+        for key, value in sorted(series):
+            yield f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}'
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.label_names)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+        _recorded()
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self):
+        with self._lock:
+            return [(key, list(values)) for key, values in self._series.items()]
+
+    def _reset(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def merge(total, values):
+        return [a + b for a, b in zip(total, values)]
+
+    def collect(self, series):
+        for key, values in sorted(series):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                le = (('le', bound if bound == '+Inf' else _format_value(float(bound))),)
+                yield f'{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(float(values[-1]))}'
+            yield f'{self.name}_count{_format_labels(self.label_names, key)} {cumulative}'
+
+def timed(histogram, **labels):
+    """Decorator recording each call's duration in ``histogram``."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started, **labels)
+        return wrapper
+    return decorator
+
+def instrument_methods(obj, histogram, names, label='method'):
+    """Time the given methods of ``obj`` in ``histogram``, labelled by method name."""
+    for name in names:
+        method = getattr(obj, name, None)
+        if callable(method):
+            setattr(obj, name, timed(histogram, **{label: name})(method))
+
+def configure(directory, flush_interval=5.0):
+    """Aggregate metrics across processes through snapshot files in ``directory``."""
+    global _directory, _flush_interval
+    os.makedirs(directory, exist_ok=True)
+    _directory = directory
+    _flush_interval = flush_interval
+
+def clear_snapshots(directory):
+    """Delete snapshot files left in ``directory`` by a previous run."""
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.endswith('.json'):
+                os.remove(os.path.join(directory, name))
+
+def _recorded():
+    global _changes
+    _changes += 1
+    if _directory is not None and _flusher_pid != os.getpid():
+        _start_flusher()
+
+def _start_flusher():
+    global _flusher_pid, _snapshot_path
+    with _flush_lock:
+        if _flusher_pid == os.getpid():
+            return
+        # A fresh name per process, so a recycled worker reusing a pid never overwrites the old file.
+        _snapshot_path = os.path.join(_directory, f'{os.getpid()}-{uuid.uuid4().hex[:8]}.json')
+        _flusher_pid = os.getpid()
+    threading.Thread(target=_flush_loop, name='metrics-flusher', daemon=True).start()
+
+def _flush_loop():
+    written = None
+    while True:
+        time.sleep(_flush_interval)
+        changes = _changes
+        if changes != written:
+            try:
+                flush()
+            except OSError as e:
+                logger.warning("Failed to write metrics snapshot: %s", e)
+            written = changes
+
+def flush():
+    """Write this process's snapshot file now; a no-op until it has recorded a sample."""
+    if _directory is None or _flusher_pid != os.getpid():
+        return
+    snapshot = {metric.name: metric.snapshot() for metric in _registry}
+    with _flush_lock:
+        temporary = f'{_snapshot_path}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(temporary, _snapshot_path)
+
+def _after_fork_in_child():
+    # Samples taken before the fork belong to the parent (and its file), so
+    # the child starts from zero; a lock held across the fork is replaced too.
+    global _flusher_pid
+    if _directory is not None:
+        _flusher_pid = None
+        for metric in _registry:
+            metric._reset()
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+atexit.register(flush)
+
+def _load_snapshots():
+    metrics = {metric.name: metric for metric in _registry}
+    totals = {name: {} for name in metrics}
+    for name in os.listdir(_directory):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(_directory, name)) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue  # removed or being cleared
+        for metric_name, series in snapshot.items():
+            if metric_name not in metrics:
+                continue
+            merged = totals[metric_name]
+            for key, value in series:
+                key = tuple(key)
+                merged[key] = metrics[metric_name].merge(merged[key], value) if key in merged else value
+    return {name: list(series.items()) for name, series in totals.items()}
+
+def render():
+    """All registered metrics in the Prometheus text format (version 0.0.4)."""
+    if _directory is None:
+        series = {metric.name: metric.snapshot() for metric in _registry}
+    else:
+        flush()
+        series = _load_snapshots()
+    lines = []
+    for metric in _registry:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.collect(series.get(metric.name, [])))
+    return '\n'.join(lines) + '\n'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
@@ -0,0 +1,92 @@
+"""Shared rate-limit counters for flask_limiter.
+
+Importing this module registers a ``sqlite:///rate_limits.db`` storage backend
+for `limits`: one WAL-mode file shared by all gunicorn workers on a host, so
+every worker enforces the same counters instead of each keeping its own. It
+implements the fixed-window operations flask_limiter uses by default.
+
+Across hosts, use the ``redis://`` storage that ships with `limits` (it needs
+the redis package).
+"""
+import logging
+import sqlite3
+import time
+from functools import partial
+
+from limits.storage import Storage
+
+from database import ConnectionPool, PoolTimeout, connect
+
+logger = logging.getLogger(__name__)
+
+class SQLiteStorage(Storage):
+    """Fixed-window counters in a SQLite file, for multi-worker single-host deployments."""
+
+    STORAGE_SCHEME = ['sqlite']
+    PURGE_EVERY = 1000  # incr calls between sweeps of expired rows
+
+    def __init__(self, uri, wrap_exceptions=False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        # sqlite:///relative.db or sqlite:////absolute/path.db
+        self.path = uri[len('sqlite://'):][1:] or 'rate_limits.db'
+        self.pool = ConnectionPool(partial(connect, self.path), max_size=int(options.get('pool_size', 4)))
+        self._calls = 0
+        with self.pool.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS rate_limits (
+                    key TEXT PRIMARY KEY,
+                    count INTEGER NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+
+    @property
+    def base_exceptions(self):
+        return (sqlite3.Error, PoolTimeout)
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        with self.pool.transaction() as conn:
+            # The upsert takes the write lock, so the read-back below sees our own increment.
+            conn.execute('''
+                INSERT INTO rate_limits (key, count, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    count = CASE WHEN expires_at <= ? THEN excluded.count ELSE count + excluded.count END,
+                    expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END
+            ''', (key, amount, now + expiry, now, now))
+            count = conn.execute('SELECT count FROM rate_limits WHERE key = ?', (key,)).fetchone()[0]
+            self._calls += 1
+            if self._calls % self.PURGE_EVERY == 0:
+                conn.execute('DELETE FROM rate_limits WHERE expires_at <= ?', (now,))
+        return count
+
+    def get(self, key):
+        with self.pool.transaction() as conn:
+            row = conn.execute(
+                'SELECT count FROM rate_limits WHERE key = ? AND expires_at > ?', (key, time.time())
+            ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        now = time.time()
+        with self.pool.transaction() as conn:
+            row = conn.execute(
+                'SELECT expires_at FROM rate_limits WHERE key = ? AND expires_at > ?', (key, now)
+            ).fetchone()
+        return row[0] if row else now
+
+    def check(self):
+        try:
+            with self.pool.transaction() as conn:
+                conn.execute('SELECT 1')
+            return True
+        except self.base_exceptions:
+            return False
+
+    def reset(self):
+        with self.pool.transaction() as conn:
+            return conn.execute('DELETE FROM rate_limits').rowcount
+
+    def clear(self, key):
+        with self.pool.transaction() as conn:
+            conn.execute('DELETE FROM rate_limits WHERE key = ?', (key,))
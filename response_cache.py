@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+from database import ConnectionPool, connect
+
+logger = logging.getLogger(__name__)
+
+def make_cache_key(model_name, system_prompt, messages):
+    """Exact-match key over everything that shapes the completion."""
+    payload = json.dumps(
+        [model_name, system_prompt, [[msg['role'], msg['content']] for msg in messages]],
+        ensure_ascii=False, separators=(',', ':')
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def evicted(self, count=1):
+        with self._lock:
+            self.evictions += count
+
+    def as_dict(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
+
+class MemoryResponseCache:
+    """In-process LRU cache bounded by entry count, total bytes and TTL."""
+
+    backend = 'memory'
+
+    def __init__(self, ttl=3600, max_entries=1000, max_bytes=64 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._bytes = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._drop(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        self.stats.record(entry is not None)
+        return entry[1] if entry is not None else None
+
+    def set(self, key, value):
+        size = len(value.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._bytes += size
+            evicted = 0
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                evicted += 1
+        if evicted:
+            self.stats.evicted(evicted)
+
+    def _drop(self, key):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value.encode('utf-8'))
+
+    def info(self):
+        return dict(self.stats.as_dict(), backend=self.backend, entries=len(self._entries), bytes=self._bytes)
+
+class SqliteResponseCache:
+    """File-backed LRU cache shared by every worker process on the host."""
+
+    backend = 'sqlite'
+
+    def __init__(self, path='response_cache.db', ttl=3600, max_entries=10000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self.pool = ConnectionPool(partial(connect, path), max_size=4)
+        with self.pool.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_response_cache_last_used ON response_cache(last_used)')
+
+    def get(self, key):
+        now = time.time()
+        try:
+            with self.pool.transaction() as conn:
+                row = conn.execute(
+                    'SELECT value FROM response_cache WHERE key = ? AND expires_at > ?', (key, now)
+                ).fetchone()
+                if row is not None:
+                    conn.execute('UPDATE response_cache SET last_used = ? WHERE key = ?', (now, key))
+        except sqlite3.Error as e:
+            # The cache is an optimization; a locked or corrupt file must not fail the request.
+            logger.warning("Response cache read failed: %s", e)
+            row = None
+        self.stats.record(row is not None)
+        return row[0] if row is not None else None
+
+    def set(self, key, value):
+        now = time.time()
+        try:
+            with self.pool.transaction() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO response_cache (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)',
+                    (key, value, now + self.ttl, now)
+                )
+                evicted = conn.execute('DELETE FROM response_cache WHERE expires_at <= ?', (now,)).rowcount
+                evicted += conn.execute(
+                    '''
+                    DELETE FROM response_cache WHERE key IN (
+                        SELECT key FROM response_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                    )
+                    ''',
+                    (self.max_entries,)
+                ).rowcount
+        except sqlite3.Error as e:
+            logger.warning("Response cache write failed: %s", e)
+            return
+        if evicted:
+            self.stats.evicted(evicted)
+
+    def info(self):
+        return dict(self.stats.as_dict(), backend=self.backend, path=self.path)
+
+def create_response_cache(backend, ttl=3600, max_entries=1000, max_bytes=64 * 1024 * 1024, path='response_cache.db'):
+    """Build the configured cache, or return None when caching is off."""
+    if backend in (None, '', 'off', 'none'):
+        return None
+    if backend == 'memory':
+        return MemoryResponseCache(ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+    if backend == 'sqlite':
+        return SqliteResponseCache(path=path, ttl=ttl, max_entries=max_entries)
+    raise ValueError(f"Unknown RESPONSE_CACHE backend: {backend}")
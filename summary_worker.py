@@ -0,0 +1,78 @@
+import logging
+
+from background_worker import BackgroundWorker
+from context_builder import truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+class SummaryWorker(BackgroundWorker):
+    """Folds older chat turns into a rolling per-chat summary on background threads.
+
+    ``summarize(previous_summary, transcript)`` returns the new summary. A chat
+    is re-summarized once ``interval`` messages have accumulated past the
+    summarized point; the newest ``keep_recent`` messages stay verbatim so the
+    prompt always ends with the live exchange. Like TitleWorker, jobs wait in a
+    bounded queue and are dropped (to be retried on a later turn) when it is
+    full, and a chat is never queued twice at once. Messages longer than
+    ``max_message_tokens`` (uploaded documents) are truncated in the transcript.
+    """
+
+    thread_name = 'summary-worker'
+
+    def __init__(self, db, summarize, interval=10, keep_recent=4, batch_size=50,
+                 max_message_tokens=1000, workers=1, max_pending=100):
+        super().__init__(workers, max_pending)
+        self.db = db
+        self.summarize = summarize
+        self.interval = interval
+        self.keep_recent = keep_recent
+        self.batch_size = batch_size
+        self.max_message_tokens = max_message_tokens
+
+    def due(self, unsummarized):
+        return self.interval > 0 and unsummarized >= self.interval + self.keep_recent
+
+    def submit(self, chat_id, user_id):
+        if self.enqueue((chat_id, user_id), key=chat_id):
+            return True
+        logger.warning("Summary queue full; chat %s will be summarized on a later turn", chat_id)
+        return False
+
+    def update(self, chat_id, user_id):
+        """Fold unsummarized messages, oldest first and ``batch_size`` at a time, into
+        the summary until only the chat's newest ``keep_recent`` remain."""
+        summary, through = self.db.get_chat_summary(chat_id, user_id)
+        keep_from = None
+        if self.keep_recent:
+            tail = self.db.get_recent_messages(chat_id, user_id, self.keep_recent, after_id=through)
+            if len(tail) < self.keep_recent:
+                return False
+            keep_from = tail[0]['id']
+        updated = False
+        while True:
+            batch = self.db.get_messages_after(chat_id, user_id, through, self.batch_size)
+            fold = [msg for msg in batch if keep_from is None or msg['id'] < keep_from]
+            if not fold:
+                return updated
+            transcript = "\n".join(
+                f"{msg['role']}: {self._clip(msg)}" for msg in fold
+            )
+            new_summary = self.summarize(summary, transcript)
+            if not new_summary or not self.db.update_chat_summary(chat_id, user_id, new_summary, fold[-1]['id']):
+                return updated
+            summary, through, updated = new_summary, fold[-1]['id'], True
+            if len(fold) < self.batch_size:
+                return updated
+
+    def _clip(self, msg):
+        tokens = msg.get('token_count')
+        if tokens is not None and tokens <= self.max_message_tokens:
+            return msg['content']
+        return truncate_to_tokens(msg['content'], self.max_message_tokens)
+
+    def process(self, job):
+        chat_id, user_id = job
+        try:
+            self.update(chat_id, user_id)
+        except Exception as e:
+            logger.warning("Failed to summarize chat %s: %s", chat_id, e)
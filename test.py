@@ -15,6 +15,8 @@ from openai import OpenAI, OpenAIError
 from werkzeug.utils import secure_filename
 from tenacity import retry, stop_after_attempt, wait_fixed
 
+from llm_clients import registry as llm_registry
+
 # LangChain integrations (latest modular imports)
 from langchain_nvidia_ai_endpoints import ChatNVIDIA
 from langchain_xai import ChatXAI
@@ -52,7 +54,9 @@ CUSTOM_MODULES_AVAILABLE = False
 # Custom modules
 try:
     from database import Database
-    from auth import init_auth, requires_auth, get_user
+    from auth import AUTHLIB_AVAILABLE, init_auth, get_oauth, requires_auth, get_user
+    if not AUTHLIB_AVAILABLE:
+        raise ImportError("authlib is not installed")
     CUSTOM_MODULES_AVAILABLE = True
 except ImportError:
     
@@ -144,29 +148,35 @@ if not CUSTOM_MODULES_AVAILABLE:
     get_user = oauth.get_user
 else:
     db = Database()
-    oauth = init_auth(app)
+    init_auth(app)
 
-# LangChain Clients Factory
+# LangChain Clients Factory (instances are cached in the process-wide registry)
 def get_llm_client(model_name):
     if "nvidia" in model_name.lower() or "llama" in model_name.lower():
-        return ChatNVIDIA(
-            model=model_name,
+        return llm_registry.get(
+            'nvidia',
+            model_name,
+            ChatNVIDIA,
             api_key=os.environ.get("NVIDIA_API_KEY"),
             temperature=0.7,
             top_p=0.9,
             max_tokens=1024,
         )
     elif "grok" in model_name.lower() or "xai" in model_name.lower():
-        return ChatXAI(
-            model=model_name,
+        return llm_registry.get(
+            'xai',
+            model_name,
+            ChatXAI,
             api_key=os.environ.get("XAI_API_KEY"),
             temperature=0.7,
             top_p=0.9,
             max_tokens=1024,
         )
     elif "deepseek" in model_name.lower():
-        return ChatDeepSeek(
-            model=model_name,
+        return llm_registry.get(
+            'deepseek',
+            model_name,
+            ChatDeepSeek,
             api_key=os.environ.get("DEEPSEEK_API_KEY"),
             temperature=0.7,
             top_p=0.9,
@@ -373,21 +383,21 @@ def login():
     if not CUSTOM_MODULES_AVAILABLE:
         return jsonify({'error': 'Authentication not available in demo mode'}), 400
     redirect_uri = url_for('callback', _external=True)
-    return oauth.auth0.authorize_redirect(redirect_uri)
+    return get_oauth().auth0.authorize_redirect(redirect_uri)
 
 @app.route('/api/auth/signup')
 def signup():
     if not CUSTOM_MODULES_AVAILABLE:
         return jsonify({'error': 'Authentication not available in demo mode'}), 400
     redirect_uri = url_for('callback', _external=True)
-    return oauth.auth0.authorize_redirect(redirect_uri, screen_hint='signup')
+    return get_oauth().auth0.authorize_redirect(redirect_uri, screen_hint='signup')
 
 @app.route('/api/auth/callback')
 def callback():
     if not CUSTOM_MODULES_AVAILABLE:
         return jsonify({'error': 'Authentication not available in demo mode'}), 400
     try:
-        token = oauth.auth0.authorize_access_token()
+        token = get_oauth().auth0.authorize_access_token()
         session['user'] = token['userinfo']
         return redirect('/chat')
     except Exception as e:
@@ -0,0 +1,36 @@
+import logging
+
+from background_worker import BackgroundWorker
+
+logger = logging.getLogger(__name__)
+
+class TitleWorker(BackgroundWorker):
+    """Generates chat titles on background threads.
+
+    ``generate(text)`` produces a title and ``store(chat_id, user_id, title)``
+    persists it. Jobs wait in a bounded queue; when it is full ``submit``
+    returns False immediately so request threads never block on a cosmetic task
+    and the chat simply keeps its placeholder title.
+    """
+
+    thread_name = 'title-worker'
+
+    def __init__(self, generate, store, workers=2, max_pending=100):
+        super().__init__(workers, max_pending)
+        self.generate = generate
+        self.store = store
+
+    def submit(self, chat_id, user_id, text):
+        if self.enqueue((chat_id, user_id, text)):
+            return True
+        logger.warning("Title queue full; chat %s keeps its placeholder title", chat_id)
+        return False
+
+    def process(self, job):
+        chat_id, user_id, text = job
+        try:
+            title = self.generate(text)
+            if title:
+                self.store(chat_id, user_id, title)
+        except Exception as e:
+            logger.warning("Failed to generate chat title: %s", e)
@@ -0,0 +1,54 @@
+import hashlib
+import tempfile
+from io import BytesIO
+
+from werkzeug.exceptions import RequestEntityTooLarge
+
+class UploadSpool:
+    """Multipart file container that hashes and size-checks while it is written.
+
+    Werkzeug streams each uploaded file into the container returned by
+    ``Request._get_file_stream`` chunk by chunk. This one keeps the bytes in
+    memory up to ``threshold`` and then moves them to a named temporary file,
+    so request memory is bounded by the threshold rather than the upload size.
+    Files over ``max_size`` abort the parse with 413 as soon as the limit is
+    crossed. After parsing, ``size``, ``hexdigest()`` and ``path`` (None while
+    in memory) are available without another pass over the data.
+    """
+
+    def __init__(self, threshold, max_size):
+        self.threshold = threshold
+        self.max_size = max_size
+        self.size = 0
+        self.path = None
+        self._sha256 = hashlib.sha256()
+        self._file = BytesIO()
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            raise RequestEntityTooLarge()
+        self._sha256.update(data)
+        if self.path is None and self.size > self.threshold:
+            self._rollover()
+        return self._file.write(data)
+
+    def _rollover(self):
+        spooled = tempfile.NamedTemporaryFile(prefix='upload-', suffix='.part')
+        spooled.write(self._file.getbuffer())
+        self._file = spooled
+        self.path = spooled.name
+
+    def hexdigest(self):
+        return self._sha256.hexdigest()
+
+    def source(self):
+        """Path when spooled to disk, otherwise the in-memory bytes (at most ``threshold``)."""
+        return self.path if self.path is not None else self._file.getvalue()
+
+    def __getattr__(self, name):
+        # read/seek/tell/close/... go straight to the backing file.
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
@@ -0,0 +1,137 @@
+"""Vision-model text extraction for images and scanned PDFs.
+
+Talks to any OpenAI-compatible chat-completions endpoint (VISION_API_BASE),
+which also makes it easy to point at a local stub server.
+"""
+import base64
+import importlib.util
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from extraction import count_pdf_pages
+
+logger = logging.getLogger(__name__)
+
+# pdf2image (and PIL behind it) is imported on first rasterization.
+PDF2IMAGE_AVAILABLE = importlib.util.find_spec('pdf2image') is not None
+if not PDF2IMAGE_AVAILABLE:
+    logger.warning("pdf2image not available. Vision processing disabled.")
+
+VISION_API_BASE = os.environ.get('VISION_API_BASE')
+VISION_MODEL = os.environ.get('VISION_MODEL', 'nvidia/llama-3.1-nemotron-nano-vl-8b-v1')
+VISION_MAX_PAGES = int(os.environ.get('VISION_MAX_PAGES', 3))
+VISION_CONCURRENCY = int(os.environ.get('VISION_CONCURRENCY', 3))
+VISION_DPI = int(os.environ.get('VISION_DPI', 150))
+VISION_TIMEOUT = float(os.environ.get('VISION_TIMEOUT', 60))
+
+PAGE_PROMPT = "Extract all text from this document page. Return only the text."
+IMAGE_PROMPT = "Extract text or describe the content of this image clearly and concisely."
+
+class VisionClient:
+    """Minimal OpenAI-compatible vision client with a shared keep-alive session."""
+
+    def __init__(self, base_url, api_key=None, model=VISION_MODEL, timeout=VISION_TIMEOUT, system_prompt=None):
+        import requests
+
+        self.url = base_url.rstrip('/') + '/chat/completions'
+        self.model = model
+        self.timeout = timeout
+        self.system_prompt = system_prompt
+        self.session = requests.Session()
+        # One pooled connection per concurrent page request.
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(VISION_CONCURRENCY, 10))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if api_key:
+            self.session.headers['Authorization'] = f'Bearer {api_key}'
+
+    def read_image(self, image_bytes, prompt, mime_type='image/png', max_tokens=2048):
+        img_str = base64.b64encode(image_bytes).decode('utf-8')
+        messages = [{"role": "system", "content": self.system_prompt}] if self.system_prompt else []
+        messages.append({
+            "role": "user",
+            "content": [
+                {"type": "image_url", "image_url": {"url": f"data:{mime_type};base64,{img_str}"}},
+                {"type": "text", "text": prompt}
+            ]
+        })
+        response = self.session.post(self.url, timeout=self.timeout, json={
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.2,
+            "top_p": 0.1,
+            "max_tokens": max_tokens,
+        })
+        response.raise_for_status()
+        return response.json()['choices'][0]['message']['content']
+
+    def close(self):
+        self.session.close()
+
+def vision_enabled():
+    return bool(VISION_API_BASE)
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_vision_client(system_prompt=None):
+    """Process-wide client, or None when no vision endpoint is configured."""
+    global _client
+    if not vision_enabled():
+        return None
+    with _client_lock:
+        if _client is None:
+            _client = VisionClient(VISION_API_BASE, os.environ.get('VISION_API_KEY'), system_prompt=system_prompt)
+        return _client
+
+def rasterize_pdf(file_content, last_page, dpi=VISION_DPI):
+    from pdf2image import convert_from_bytes
+
+    # pdf2image splits the page range across parallel pdftoppm processes.
+    return convert_from_bytes(
+        file_content, dpi=dpi, first_page=1, last_page=last_page,
+        fmt='png', thread_count=max(1, min(last_page, VISION_CONCURRENCY))
+    )
+
+def process_image_with_vision(client, file_content, filename):
+    extension = filename.rsplit('.', 1)[1].lower()
+    mime_type = 'image/png' if extension == 'png' else 'image/jpeg'
+    try:
+        return client.read_image(file_content, IMAGE_PROMPT, mime_type, max_tokens=1024)
+    except Exception as e:
+        logger.error("Image processing error: %s", e)
+        raise Exception(f"Failed to process image: {str(e)}")
+
+def extract_text_with_vision_model(client, file_content, max_pages=VISION_MAX_PAGES,
+                                   concurrency=VISION_CONCURRENCY, rasterize=rasterize_pdf):
+    """Rasterize the first ``max_pages`` pages and read them concurrently.
+
+    Pages are sent to the vision endpoint with at most ``concurrency`` requests
+    in flight and reassembled in page order, so an N-page document costs about
+    one round trip instead of N. ``rasterize(file_content, last_page)`` is
+    injectable for tests that run without poppler.
+    """
+    if rasterize is rasterize_pdf and not PDF2IMAGE_AVAILABLE:
+        raise Exception("Vision processing requires pdf2image")
+    try:
+        num_pages = count_pdf_pages(file_content)
+        last_page = min(max_pages, num_pages)
+        if num_pages > max_pages:
+            logger.warning("PDF has %d pages, processing only first %d.", num_pages, max_pages)
+        images = rasterize(file_content, last_page)
+
+        def read_page(image):
+            buffered = BytesIO()
+            image.save(buffered, format="PNG")
+            return client.read_image(buffered.getvalue(), PAGE_PROMPT)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(images)))) as pool:
+            # map() yields results in submission order regardless of completion order.
+            texts = list(pool.map(read_page, images))
+        return "\n\n".join(f"--- Page {i + 1} ---\n{text}" for i, text in enumerate(texts))
+    except Exception as e:
+        logger.error("PDF vision processing error: %s", e)
+        raise Exception(f"Failed to process PDF with vision model: {str(e)}")